@@ -1,4 +1,6 @@
 # stac demo
+#
+# requires the eocis_stac_tools package to be installed, see "Installation" in the README
 
 import datetime
 
@@ -6,15 +8,11 @@ from pystac_client import Client
 import xarray as xr
 import matplotlib.pyplot as plt
 
-# define a helper function that will return an xarray dataset given a stac item
-def open_dataset_from_stac_item(item):
-    for (key, value) in item.assets.items():
-        if key == "reference_file":
-            return xr.open_dataset("reference://", engine="zarr", backend_kwargs={
-                "consolidated": False,
-                "storage_options": {"fo": value.href, "remote_protocol": "https", "remote_options": {}}
-            })
-    return None
+from eocis_stac_tools.client.datasets import StacDatasetOpener
+
+# the opener caches the datasets it opens, so each climatology item is only opened once,
+# and opens multiple items concurrently
+opener = StacDatasetOpener()
 
 # open the STAC endpoint
 client = Client.open("https://api.stac.ceda.ac.uk")
@@ -35,13 +33,17 @@ search = client.search(
     collections=['eocis-sst-cdrv3'],
     datetime=(datetime.datetime(2023,1,1,0,0,0),datetime.datetime(2023,1,4,23,59,59))
 )
+items = search.item_collection().items
+
+# open the data and matching climatology items concurrently
+datasets = opener.open_datasets(items)
+climatology_datasets = opener.open_datasets(climatology_item_lookup[item.datetime.timetuple()[7]] for item in items)
 
-# go through the items returned from the search, calculate the anomalies and add them to a list
+# calculate the anomalies for each item and add them to a list
 data = []
-for item in search.item_collection().items:
-    sst = open_dataset_from_stac_item(item).analysed_sst.sel(lat=slice(48,61),lon=slice(-12,3)).squeeze()
-    day_of_year = item.datetime.timetuple()[7]
-    sst_climatology = open_dataset_from_stac_item(climatology_item_lookup[day_of_year]).analysed_sst.sel(lat=slice(48,61),lon=slice(-12,3))
+for (ds, climatology_ds) in zip(datasets, climatology_datasets):
+    sst = ds.analysed_sst.sel(lat=slice(48,61),lon=slice(-12,3)).squeeze()
+    sst_climatology = climatology_ds.analysed_sst.sel(lat=slice(48,61),lon=slice(-12,3))
     anomaly = sst - sst_climatology
     data.append(anomaly)
 
@@ -52,4 +54,3 @@ da = xr.concat(data,dim="time")
 da = da.mean(dim="time")
 da.plot()
 plt.show()
-
@@ -0,0 +1,267 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import datetime
+import json
+import os
+import struct
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# item properties holding timestamps, stored as timestamp columns rather than strings
+DATETIME_PROPERTIES = ["datetime", "start_datetime", "end_datetime", "created", "updated"]
+
+GEOPARQUET_VERSION = "1.1.0"
+STAC_GEOPARQUET_VERSION = "1.0.0"
+
+WKB_GEOMETRY_TYPES = {1: "Point", 3: "Polygon", 6: "MultiPolygon"}
+
+COMMON_METADATA_FILENAME = "_common_metadata"
+
+# file metadata key holding the path of each item in the file (by id), used to replace regenerated items on append
+ITEM_PATHS_METADATA_KEY = b"eocis:item_paths"
+
+
+def parse_datetime(s):
+    if s is None:
+        return None
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    dt = datetime.datetime.fromisoformat(s)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+
+def encode_wkb(geometry):
+    # little-endian WKB encoding for the geometry types used in STAC item footprints
+    def encode_ring(ring):
+        return struct.pack("<I", len(ring)) + b"".join(struct.pack("<dd", p[0], p[1]) for p in ring)
+
+    def encode_polygon(rings):
+        return struct.pack("<BII", 1, 3, len(rings)) + b"".join(encode_ring(ring) for ring in rings)
+
+    gtype = geometry["type"]
+    coords = geometry["coordinates"]
+    if gtype == "Point":
+        return struct.pack("<BIdd", 1, 1, coords[0], coords[1])
+    if gtype == "Polygon":
+        return encode_polygon(coords)
+    if gtype == "MultiPolygon":
+        return struct.pack("<BII", 1, 6, len(coords)) + b"".join(encode_polygon(polygon) for polygon in coords)
+    raise Exception(f"unsupported geometry type {gtype}")
+
+
+def flatten_item(item):
+    """
+    Convert a STAC item (as a dictionary) into a stac-geoparquet row, with the item properties flattened into columns.
+    Links are stored as a list of structs and assets as a struct (keyed on the asset name), as required by the
+    stac-geoparquet specification.
+    """
+    bbox = item.get("bbox", None)
+    row = {
+        "type": item.get("type", "Feature"),
+        "stac_version": item.get("stac_version", None),
+        "stac_extensions": item.get("stac_extensions", []),
+        "id": item["id"],
+        "geometry": encode_wkb(item["geometry"]) if item.get("geometry", None) else None,
+        "bbox": {"xmin": bbox[0], "ymin": bbox[1], "xmax": bbox[-2], "ymax": bbox[-1]} if bbox else None,
+        "links": item.get("links", []),
+        "assets": item.get("assets", {}),
+        "collection": item.get("collection", None)
+    }
+    for (key, value) in item.get("properties", {}).items():
+        if key in DATETIME_PROPERTIES:
+            value = parse_datetime(value)
+        row[key] = value
+    return row
+
+
+def get_column_type(key, values):
+    if key in DATETIME_PROPERTIES:
+        return pa.timestamp("us", tz="UTC")
+    column_type = pa.array(values).type
+    # columns with no values yet are stored as strings, a null column type could not be unified with later appends
+    if pa.types.is_null(column_type):
+        return pa.string()
+    return column_type
+
+
+def conform_table(table, schema):
+    # cast a table read from an existing file to the dataset schema, adding any missing columns
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def read_geoparquet(path, columns=None):
+    """
+    Read a stac-geoparquet dataset written by GeoParquetWriter, using the schema shared by all of its files
+
+    :param path: path to the folder containing the dataset
+    :param columns: list of columns to read, or None to read all columns
+    :return: a pyarrow Table
+    """
+    schema = pq.read_schema(os.path.join(path, COMMON_METADATA_FILENAME))
+    return pq.read_table(path, columns=columns, schema=schema.append(pa.field("year", pa.int32())))
+
+
+class GeoParquetWriter:
+
+    def __init__(self, path):
+        """
+        Write STAC items to a stac-geoparquet dataset, a folder containing one sub-folder per year (year=YYYY).
+        Each flush rewrites only the years it has items for, replacing any rows for items with the same id or item path.
+        The schema shared by all files is written to the _common_metadata file, see read_geoparquet.
+
+        :param path: path to the folder containing the dataset
+        """
+        self.path = path
+        self.rows = {}
+        # the path of each item (by id) for each year
+        self.item_paths = {}
+
+    def add_item(self, item, item_path=None):
+        row = flatten_item(item)
+        dt = row.get("datetime", None) or row.get("start_datetime", None)
+        if dt is None:
+            raise Exception(f"item {item['id']} has no datetime or start_datetime")
+        self.rows.setdefault(dt.year, []).append(row)
+        self.item_paths.setdefault(dt.year, {})[item["id"]] = item_path or item["id"]
+
+    def add_item_file(self, path):
+        with open(path) as f:
+            o = json.loads(f.read())
+        if o.get("type", None) != "Feature":
+            return False
+        self.add_item(o, item_path=path)
+        return True
+
+    def get_existing_files(self):
+        existing_files = {}
+        if os.path.isdir(self.path):
+            for folder in os.listdir(self.path):
+                if folder.startswith("year="):
+                    year = int(folder[len("year="):])
+                    year_folder = os.path.join(self.path, folder)
+                    existing_files[year] = [os.path.join(year_folder, filename) for filename in sorted(os.listdir(year_folder))
+                                            if filename.endswith(".parquet")]
+        return existing_files
+
+    def get_schema(self, existing_files, rows):
+        # start with the schema of the existing files, so that columns keep their types across appends
+        existing_schemas = [pq.read_schema(path).remove_metadata() for paths in existing_files.values() for path in paths]
+        # years written by earlier flushes may hold narrower types, for example integers where later years hold floats
+        schema = pa.unify_schemas(existing_schemas, promote_options="permissive") if existing_schemas else pa.schema([])
+
+        keys = []
+        for row in rows:
+            for key in row:
+                if key not in keys:
+                    keys.append(key)
+
+        for key in keys:
+            column_type = get_column_type(key, [row.get(key, None) for row in rows])
+            index = schema.get_field_index(key)
+            if index == -1:
+                schema = schema.append(pa.field(key, column_type))
+            else:
+                # widen the existing type if needed, for example from integer to floating point
+                unified = pa.unify_schemas([pa.schema([schema.field(index)]), pa.schema([pa.field(key, column_type)])],
+                                           promote_options="permissive")
+                schema = schema.set(index, unified.field(key))
+        return schema
+
+    def get_metadata(self, geometry_types, item_paths=None):
+        metadata = {
+            b"geo": json.dumps({
+                "version": GEOPARQUET_VERSION,
+                "primary_column": "geometry",
+                "columns": {
+                    "geometry": {
+                        "encoding": "WKB",
+                        "geometry_types": geometry_types,
+                        "covering": {
+                            "bbox": {"xmin": ["bbox", "xmin"], "ymin": ["bbox", "ymin"], "xmax": ["bbox", "xmax"], "ymax": ["bbox", "ymax"]}
+                        }
+                    }
+                }
+            }).encode(),
+            b"stac-geoparquet": json.dumps({"version": STAC_GEOPARQUET_VERSION}).encode()
+        }
+        if item_paths is not None:
+            metadata[ITEM_PATHS_METADATA_KEY] = json.dumps(item_paths).encode()
+        return metadata
+
+    def get_file_item_paths(self, path):
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata.get(ITEM_PATHS_METADATA_KEY, b"{}"))
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        existing_files = self.get_existing_files()
+        schema = self.get_schema(existing_files, [row for rows in self.rows.values() for row in rows])
+        part_name = f"part-{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+
+        for (year, rows) in self.rows.items():
+            new_table = pa.Table.from_pylist(rows, schema=schema)
+
+            # keep the existing rows for this year, except those replaced by the new rows
+            new_item_paths = self.item_paths[year]
+            item_paths = {}
+            tables = []
+            for path in existing_files.get(year, []):
+                file_item_paths = self.get_file_item_paths(path)
+                replaced = [item_id for (item_id, item_path) in file_item_paths.items()
+                            if item_id in new_item_paths or item_path in new_item_paths.values()]
+                table = conform_table(pq.read_table(path), schema)
+                table = table.filter(pc.invert(pc.is_in(table.column("id"), value_set=pa.array(replaced, type=pa.string()))))
+                item_paths.update((item_id, file_item_paths.get(item_id, item_id)) for item_id in table.column("id").to_pylist())
+                tables.append(table)
+            item_paths.update(new_item_paths)
+            table = pa.concat_tables(tables + [new_table])
+            table = table.sort_by([("datetime", "ascending"), ("id", "ascending")]) if "datetime" in table.column_names else table
+
+            geometry_types = sorted(set(WKB_GEOMETRY_TYPES[struct.unpack_from("<I", g, 1)[0]]
+                                        for g in table.column("geometry").to_pylist() if g is not None))
+            table = table.replace_schema_metadata(self.get_metadata(geometry_types, item_paths))
+
+            year_folder = os.path.join(self.path, f"year={year}")
+            os.makedirs(year_folder, exist_ok=True)
+            # write each year's items, ordered by datetime, as a single row group, then remove the files it replaces
+            pq.write_table(table, os.path.join(year_folder, part_name), row_group_size=max(table.num_rows, 1))
+            for path in existing_files.get(year, []):
+                os.remove(path)
+
+        # other years may have been written with fewer columns, readers should use this schema for the whole dataset
+        pq.write_metadata(schema.with_metadata(self.get_metadata([])), os.path.join(self.path, COMMON_METADATA_FILENAME))
+        self.rows = {}
+        self.item_paths = {}
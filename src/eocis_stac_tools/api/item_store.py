@@ -0,0 +1,215 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import datetime
+import json
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    collection TEXT,
+    path TEXT UNIQUE,
+    start_datetime REAL,
+    end_datetime REAL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_collection ON items(collection);
+CREATE INDEX IF NOT EXISTS items_datetime ON items(start_datetime, end_datetime);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_bbox USING rtree(pk, min_x, max_x, min_y, max_y);
+CREATE TABLE IF NOT EXISTS item_properties (
+    pk INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value
+);
+CREATE INDEX IF NOT EXISTS item_properties_key_value ON item_properties(key, value);
+CREATE INDEX IF NOT EXISTS item_properties_pk ON item_properties(pk);
+"""
+
+# the number of items to add between commits, when committing periodically
+COMMIT_INTERVAL = 100
+
+PROPERTY_OPERATORS = {
+    "eq": "=",
+    "neq": "!=",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">="
+}
+
+
+def to_timestamp(dt):
+    # convert a datetime or ISO 8601 string to seconds since the epoch, treating naive values as UTC
+    if dt is None:
+        return None
+    if isinstance(dt, str):
+        if dt in ("", ".."):
+            return None
+        if dt.endswith("Z"):
+            dt = dt[:-1] + "+00:00"
+        dt = datetime.datetime.fromisoformat(dt)
+    elif not isinstance(dt, datetime.datetime):
+        # a plain date, use midnight
+        dt = datetime.datetime(dt.year, dt.month, dt.day)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def parse_datetime_interval(dt):
+    # accept the forms supported by STAC API search - a single datetime, a (start, end) pair or a
+    # "start/end" string where either end may be open ("..")
+    if dt is None:
+        return (None, None)
+    if isinstance(dt, str):
+        if "/" in dt:
+            (start, end) = dt.split("/")
+            return (to_timestamp(start), to_timestamp(end))
+        t = to_timestamp(dt)
+        return (t, t)
+    if isinstance(dt, (list, tuple)):
+        return (to_timestamp(dt[0]), to_timestamp(dt[1]))
+    t = to_timestamp(dt)
+    return (t, t)
+
+
+class ItemStore:
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.uncommitted = 0
+
+    def add_item(self, item, path=None):
+        props = item.get("properties", {})
+        start = to_timestamp(props.get("start_datetime", None) or props.get("datetime", None))
+        end = to_timestamp(props.get("end_datetime", None) or props.get("datetime", None))
+
+        cur = self.conn.cursor()
+        # replace any previous version of this item, regenerated items get a new id but keep their path
+        if path is not None:
+            cur.execute("SELECT pk FROM items WHERE id = ? OR path = ?", (item["id"], path))
+        else:
+            cur.execute("SELECT pk FROM items WHERE id = ?", (item["id"],))
+        for (pk,) in cur.fetchall():
+            self.remove(pk)
+
+        cur.execute("INSERT INTO items(id, collection, path, start_datetime, end_datetime, content) VALUES(?,?,?,?,?,?)",
+                    (item["id"], item.get("collection", None), path, start, end, json.dumps(item)))
+        pk = cur.lastrowid
+
+        bbox = item.get("bbox", None)
+        if bbox is not None:
+            # for 3D bounding boxes, ignore the vertical extent
+            if len(bbox) == 6:
+                bbox = [bbox[0], bbox[1], bbox[3], bbox[4]]
+            cur.execute("INSERT INTO items_bbox(pk, min_x, max_x, min_y, max_y) VALUES(?,?,?,?,?)",
+                        (pk, bbox[0], bbox[2], bbox[1], bbox[3]))
+
+        for (key, value) in props.items():
+            # only scalar properties are indexed
+            if isinstance(value, (str, int, float)):
+                cur.execute("INSERT INTO item_properties(pk, key, value) VALUES(?,?,?)", (pk, key, value))
+
+    def add_item_file(self, filepath, path=None):
+        # path is the path to record in the store, defaults to filepath
+        with open(filepath) as f:
+            o = json.loads(f.read())
+        # skip any collection records that match the same pattern as the items
+        if o.get("type", None) == "Feature":
+            self.add_item(o, path=path or filepath)
+
+    def remove(self, pk):
+        self.conn.execute("DELETE FROM items WHERE pk = ?", (pk,))
+        self.conn.execute("DELETE FROM items_bbox WHERE pk = ?", (pk,))
+        self.conn.execute("DELETE FROM item_properties WHERE pk = ?", (pk,))
+
+    def search(self, collections=None, ids=None, bbox=None, datetime=None, properties=None, limit=None):
+        """
+        Search for items, following the semantics of a STAC API item search
+
+        :param collections: list of collection ids, items must belong to one of them
+        :param ids: list of item ids
+        :param bbox: [min_lon, min_lat, max_lon, max_lat], items must intersect it
+        :param datetime: a datetime, (start, end) pair or "start/end" string, items must intersect it
+        :param properties: dictionary mapping property name to a value or to a dictionary of operator to value,
+                           where the operator is one of eq, neq, lt, lte, gt, gte
+        :param limit: maximum number of items to return
+        :return: list of matching STAC items (as dictionaries) ordered by start datetime
+        """
+        clauses = []
+        params = []
+
+        if collections:
+            clauses.append(f"items.collection IN ({','.join('?' * len(collections))})")
+            params += list(collections)
+
+        if ids:
+            clauses.append(f"items.id IN ({','.join('?' * len(ids))})")
+            params += list(ids)
+
+        if bbox is not None:
+            clauses.append("items.pk IN (SELECT pk FROM items_bbox WHERE min_x <= ? AND max_x >= ? AND min_y <= ? AND max_y >= ?)")
+            params += [bbox[2], bbox[0], bbox[3], bbox[1]]
+
+        (start, end) = parse_datetime_interval(datetime)
+        if end is not None:
+            clauses.append("items.start_datetime <= ?")
+            params.append(end)
+        if start is not None:
+            clauses.append("items.end_datetime >= ?")
+            params.append(start)
+
+        for (key, condition) in (properties or {}).items():
+            if not isinstance(condition, dict):
+                condition = {"eq": condition}
+            for (op, value) in condition.items():
+                if op not in PROPERTY_OPERATORS:
+                    raise Exception(f"unsupported property operator {op}")
+                clauses.append(f"items.pk IN (SELECT pk FROM item_properties WHERE key = ? AND value {PROPERTY_OPERATORS[op]} ?)")
+                params += [key, value]
+
+        sql = "SELECT content FROM items"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY items.start_datetime, items.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [json.loads(content) for (content,) in self.conn.execute(sql, params)]
+
+    def commit(self):
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def commit_periodically(self):
+        self.uncommitted += 1
+        if self.uncommitted >= COMMIT_INTERVAL:
+            self.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -29,13 +29,19 @@ import uuid
 import glob
 import logging
 import base64
+import io
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
 
 import pystac
-import pandas
 
-import xarray as xr
-from kerchunk.hdf import SingleHdf5ToZarr
-from .thumbnail import Thumbnail
+from .sinks import DirectorySink
+
+# xarray, pandas and numpy are imported when the first input file is opened, kerchunk and datashader (via .thumbnail)
+# only if kerchunk or thumbnail assets are generated, so that --help and runs with nothing to do start quickly
 
 def expand_dt_template(s, dt):
     return s.format(**{
@@ -49,9 +55,19 @@ def floats(seq):
 
 class NCFileInspector:
 
-    def __init__(self, fpath, var_id, config):
+    def __init__(self, fpath, var_id, config, chunks=None, max_chunk_bytes=None):
         self.config = config
-        self.ds = xr.open_dataset(fpath)
+        import xarray as xr
+        if max_chunk_bytes and isinstance(chunks, dict):
+            # explicit chunk sizes are reduced to fit the memory limit, "auto" chunks are sized by dask instead
+            with xr.open_dataset(fpath, engine="netcdf4") as ds:
+                clamped_chunks = clamp_chunks(ds, chunks, max_chunk_bytes)
+            if clamped_chunks != chunks:
+                logging.getLogger("Netcdf2Stac").warning(f"Reduced chunk sizes from {chunks} to {clamped_chunks} to fit the memory limit")
+                chunks = clamped_chunks
+        # if chunks is specified, variables are opened as dask arrays and read chunk by chunk
+        # naming the engine avoids xarray importing every installed backend (including kerchunk's) to guess it
+        self.ds = xr.open_dataset(fpath, chunks=chunks, engine="netcdf4")
         self.var_id = var_id
         self.var = self.ds[var_id]
 
@@ -81,6 +97,7 @@ class NCFileInspector:
         return props
 
     def get_datetime(self, index=0):
+        import pandas
         return pandas.Timestamp(self.ds.time.values[index]).to_pydatetime().replace(tzinfo=datetime.timezone.utc)
 
     def get_bbox(self):
@@ -107,6 +124,13 @@ class NCFileInspector:
         except Exception as exc:
             return None
 
+    def get_variable(self, var_id):
+        # load a variable into the dataset, so that it is read once and shared by the statistics and the thumbnail
+        # variables opened with dask are left to be read chunk by chunk
+        if self.ds[var_id].chunks is None:
+            self.ds[var_id] = self.ds[var_id].load()
+        return self.ds[var_id]
+
     def get_dataset(self):
         return self.ds
 
@@ -152,21 +176,119 @@ def get_thumbnail_asset_dict(fpath, config, dt):
         d.update(config["defaults"]["thumbnail_asset"])
     return d
 
-def generate_kerchunk(filepath, url, outpath):
+def clamp_chunks(ds, chunks, max_chunk_bytes):
+    # reduce chunk sizes (a dictionary mapping dimension to size) until a chunk of every variable in ds fits within
+    # max_chunk_bytes, halving the largest chunk size each time
+    chunks = {dim: min(size, ds.sizes[dim]) if dim in ds.sizes else size for (dim, size) in chunks.items()}
+
+    def get_chunk_bytes(var):
+        nbytes = var.dtype.itemsize
+        for (dim, size) in zip(var.dims, var.shape):
+            nbytes *= min(chunks.get(dim, size), size)
+        return nbytes
+
+    while max((get_chunk_bytes(var) for var in ds.data_vars.values()), default=0) > max_chunk_bytes:
+        dims = [dim for (dim, size) in chunks.items() if size > 1]
+        if not dims:
+            break
+        dim = max(dims, key=lambda dim: chunks[dim])
+        chunks[dim] = chunks[dim] // 2
+    return chunks
+
+def get_peak_rss():
+    # return the peak resident set size of this process in bytes, or None if it cannot be determined
+    # this is the peak over the lifetime of the process, including any earlier runs in the same process
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and in kilobytes on linux
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+RASTER_EXTENSION = "https://stac-extensions.github.io/raster/v1.1.0/schema.json"
+
+def get_band_statistics(da, histogram_bins=None, histogram_range=None):
+    # compute statistics for a variable as a raster extension band object, in a single pass over dask arrays unless a
+    # histogram is requested without a range, which needs a second pass once the range of the data is known
+    data = da.data
+    chunked = da.chunks is not None
+    if chunked:
+        import dask
+        import dask.array as xp
+    else:
+        import numpy as xp
+
+    band = {"name": da.name}
+    if "units" in da.attrs:
+        band["unit"] = da.attrs["units"]
+
+    valid = xp.isfinite(data)
+    results = [valid.sum(), xp.nanmin(data), xp.nanmax(data), xp.nanmean(data, dtype="float64"),
+               xp.nanstd(data, dtype="float64")]
+    if histogram_bins and histogram_range:
+        # values outside the range (and NaNs) are not counted
+        results.append(xp.histogram(data, bins=histogram_bins, range=tuple(histogram_range))[0])
+    if chunked:
+        results = dask.compute(*results)
+    (count, minimum, maximum, mean, stddev) = [float(v) for v in results[:5]]
+    if count == 0:
+        band["statistics"] = {"valid_percent": 0.0}
+        return band
+    band["statistics"] = {
+        "minimum": minimum,
+        "maximum": maximum,
+        "mean": mean,
+        "stddev": stddev,
+        "valid_percent": 100.0 * count / data.size
+    }
+
+    if histogram_bins:
+        if histogram_range:
+            (hmin, hmax) = histogram_range
+            buckets = results[5]
+        else:
+            (hmin, hmax) = (minimum, maximum)
+            buckets = xp.histogram(data, bins=histogram_bins, range=(hmin, hmax))[0]
+            if chunked:
+                buckets = buckets.compute()
+        band["histogram"] = {"count": histogram_bins, "min": float(hmin), "max": float(hmax),
+                             "buckets": [int(b) for b in buckets]}
+    return band
+
+def file_fingerprint(fpath):
+    # cheap fingerprint of an input file, used to detect whether it has changed since its assets were generated
+    st = os.stat(fpath)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def config_fingerprint(o):
+    return hashlib.sha256(json.dumps(o, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+KERCHUNK_INLINE_THRESHOLD = 300
+
+def generate_kerchunk(filepath, url):
+    # return the content of the kerchunk reference file
+    from kerchunk.hdf import SingleHdf5ToZarr
     with open(filepath, "rb") as f:
-        h5chunks = SingleHdf5ToZarr(f, url, inline_threshold=300)
-        with open(outpath, "wb") as of:
-            of.write(json.dumps(h5chunks.translate(), indent=4).encode())
+        h5chunks = SingleHdf5ToZarr(f, url, inline_threshold=KERCHUNK_INLINE_THRESHOLD)
+        return json.dumps(h5chunks.translate(), indent=4).encode()
+
+ASSET_MANIFEST_FILENAME = ".netcdf2stac-assets.json"
 
 class Netcdf2Stac:
 
     def __init__(self, base_folder, input_paths, config_paths, collection_filename="collection.json", item_subfolder="items",
                  generate_kerchunk_assets=True, inline_kerchunk=False, generate_netcdf_assets=True, generate_thumbnail_assets=True,
-                 overwrite_items=False):
+                 overwrite_items=False, refresh_metadata=False, item_store_path=None,
+                 geoparquet_path=None, validate_output=False,
+                 schema_cache_folder=None, download_schemas=False,
+                 chunks=None, memory_limit=None, dask_threads=None,
+                 publish_url=None, publish_auth=None, publish_s3_endpoint_url=None, publish_workers=8,
+                 generate_statistics=False, sink=None):
         self.base_folder = base_folder
         self.input_paths = input_paths
+        # generated files are written to the sink, by default files in the base folder
+        self.sink = sink or DirectorySink(self.base_folder)
         self.collection_filename = collection_filename
-        self.collection_path = os.path.join(self.base_folder,self.collection_filename)
+        self.collection_path = self.sink.local_path(self.collection_filename)
         self.item_subfolder = item_subfolder
         self.config_paths = config_paths
 
@@ -182,6 +304,28 @@ class Netcdf2Stac:
         self.generate_netcdf_assets = generate_netcdf_assets
         self.generate_thumbnail_assets = generate_thumbnail_assets
         self.overwrite_items = overwrite_items
+        self.refresh_metadata = refresh_metadata
+        self.generate_statistics = generate_statistics
+        self.validate_output = validate_output
+        self.schema_cache_folder = schema_cache_folder
+        self.download_schemas = download_schemas
+        self.item_paths = []
+        self.validation_report = None
+        if validate_output and self.collection_path is None:
+            raise Exception("validating the output requires the output to be written to a folder")
+        if (item_store_path or geoparquet_path) and not self.base_folder:
+            raise Exception("an item store or geoparquet output requires a base folder")
+
+        # chunked processing, for grids too large to load into memory at once
+        self.chunks = chunks
+        self.memory_limit = memory_limit
+        if isinstance(self.memory_limit, str):
+            from dask.utils import parse_bytes
+            self.memory_limit = parse_bytes(self.memory_limit)
+        if self.memory_limit and self.chunks is None:
+            self.chunks = "auto"
+        self.dask_threads = dask_threads or os.cpu_count() or 1
+        self.peak_rss = None
 
         def merge(d1, d2):
             # recursively merge configurations d1 and d2, give d2 priority
@@ -209,16 +353,20 @@ class Netcdf2Stac:
         if "climatology_interval" in self.config:
             self.climatology_interval = (datetime.datetime.strptime(self.config["climatology_interval"][0],"%Y-%m-%d"),datetime.datetime.strptime(self.config["climatology_interval"][1],"%Y-%m-%d"))
 
-        if os.path.exists(self.collection_path):
-            with open(self.collection_path) as f:
-                o = json.loads(f.read())
-                self.collection = pystac.Collection.from_dict(o)
-                self.start_date = self.collection.extent.temporal.intervals[0][0]
-                self.end_date = self.collection.extent.temporal.intervals[0][1]
-                self.bbox = self.collection.extent.spatial.bboxes[0]
-                self.logger.info(f"Loaded existing collection {self.start_date} - {self.end_date}")
-        else:
-            self.collection = pystac.Collection(id=self.config.get("stac_collection_id", str(uuid.uuid4())),
+        collection_id = self.config.get("stac_collection_id", None)
+        collection_content = self.sink.read(self.collection_filename)
+        if collection_content is not None:
+            o = json.loads(collection_content)
+            self.collection = pystac.Collection.from_dict(o)
+            self.start_date = self.collection.extent.temporal.intervals[0][0]
+            self.end_date = self.collection.extent.temporal.intervals[0][1]
+            self.bbox = self.collection.extent.spatial.bboxes[0]
+            self.logger.info(f"Loaded existing collection {self.start_date} - {self.end_date}")
+            collection_id = collection_id or self.collection.id
+
+        if self.collection is None or self.refresh_metadata:
+            # when refreshing, rebuild the collection from the configuration but keep the existing extent
+            self.collection = pystac.Collection(id=collection_id or str(uuid.uuid4()),
                                                 href=self.collection_filename,
                                                 extent=None,
                                                 description=self.config.get("stac_collection_description", ""),
@@ -227,6 +375,7 @@ class Netcdf2Stac:
                                                 catalog_type=pystac.CatalogType.SELF_CONTAINED)
 
         if generate_thumbnail_assets and "thumbnail" in self.config:
+            from .thumbnail import Thumbnail
             tcfg = self.config["thumbnail"]
             self.thumbnail_generator = Thumbnail(
                 variable=tcfg["variable"],
@@ -240,23 +389,161 @@ class Netcdf2Stac:
         else:
             self.thumbnail_generator = None
 
-    def run(self):
-        os.makedirs(self.base_folder, exist_ok=True)
+        # records the input file and configuration that each item's kerchunk and thumbnail assets were generated from,
+        # so that refreshing the metadata can reuse assets that are still current
+        self.asset_manifest = json.loads(self.sink.read(ASSET_MANIFEST_FILENAME) or "{}")
+        self.changes = {"items_written": 0, "items_unchanged": 0, "assets_generated": 0, "assets_reused": 0}
 
-        for input_pattern in self.input_paths:
-            for fpath in glob.glob(input_pattern,recursive=True):
-                self.process_item(fpath)
+        if item_store_path:
+            from .item_store import ItemStore
+            os.makedirs(self.base_folder, exist_ok=True)
+            self.item_store = ItemStore(os.path.join(self.base_folder, item_store_path))
+        else:
+            self.item_store = None
+
+        if publish_url:
+            if not isinstance(self.sink, DirectorySink):
+                raise Exception("publishing requires the output to be written to a folder")
+            # generated files are uploaded in the background as soon as they are written
+            from .publisher import Publisher
+            self.publisher = Publisher(self.base_folder, publish_url, auth=publish_auth,
+                                       s3_endpoint_url=publish_s3_endpoint_url, max_workers=publish_workers)
+        else:
+            self.publisher = None
+        self.publish_summary = None
 
-        if self.collection_path:
-            self.finalise_collection()
+        if geoparquet_path:
+            # pyarrow is only needed if geoparquet output is requested
+            from .geoparquet import GeoParquetWriter
+            self.geoparquet_writer = GeoParquetWriter(os.path.join(self.base_folder, geoparquet_path))
+        else:
+            self.geoparquet_writer = None
+
+    def get_max_chunk_bytes(self):
+        if not self.memory_limit:
+            return None
+        # each thread holds a chunk and (at most) one intermediate result of a similar size
+        return max(self.memory_limit // (2 * self.dask_threads), 1024 * 1024)
+
+    def get_dask_config(self):
+        config = {}
+        if self.chunks is not None:
+            config["scheduler"] = "threads"
+            config["num_workers"] = self.dask_threads
+        if self.memory_limit:
+            config["array.chunk-size"] = self.get_max_chunk_bytes()
+        return config
+
+    def run(self):
+        if self.base_folder:
+            os.makedirs(self.base_folder, exist_ok=True)
+
+        try:
+            dask_config = self.get_dask_config()
+            if dask_config:
+                import dask
+                with dask.config.set(dask_config):
+                    self.process_items()
+            else:
+                self.process_items()
+
+            self.peak_rss = get_peak_rss()
+            if self.peak_rss is not None:
+                self.logger.info(f"Peak RSS of this process {self.peak_rss / (1024 * 1024):.1f} MB")
+                if self.memory_limit and self.peak_rss > self.memory_limit:
+                    self.logger.warning(f"Peak RSS of this process exceeded the memory limit of {self.memory_limit / (1024 * 1024):.1f} MB")
+
+            if self.collection_filename:
+                self.finalise_collection()
+        finally:
+            self.sink.close()
+
+        if self.publisher:
+            self.publish_summary = self.publisher.close()
+            self.logger.info(f"Published {self.publish_summary['uploaded']} file(s), {self.publish_summary['skipped']} already up to date, "
+                             f"{self.publish_summary['failed']} failed")
+
+        if self.geoparquet_writer:
+            self.geoparquet_writer.flush()
+
+        if self.validate_output:
+            self.validate()
+
+    def process_items(self):
+        try:
+            processed = set()
+            for input_pattern in self.input_paths:
+                for fpath in glob.glob(input_pattern,recursive=True):
+                    # patterns such as **/**/*.nc match the same file more than once
+                    if fpath not in processed:
+                        processed.add(fpath)
+                        self.process_item(fpath)
+        finally:
+            # keep the items indexed and the assets recorded so far, even if processing fails
+            if self.item_store:
+                self.item_store.close()
+            self.save_asset_manifest()
+
+        self.logger.info(f"Wrote {self.changes['items_written']} item(s), {self.changes['items_unchanged']} unchanged, "
+                         f"generated {self.changes['assets_generated']} asset(s), reused {self.changes['assets_reused']}")
+
+    def save_asset_manifest(self):
+        # the manifest is only useful if the outputs it describes can be found by later runs
+        if self.sink.persistent:
+            self.sink.write(ASSET_MANIFEST_FILENAME, json.dumps(self.asset_manifest, indent=4))
+
+    def is_asset_current(self, item_path, asset_name, asset_path, input_filepath, asset_config):
+        # an existing asset can be reused when refreshing the metadata, unless its input file or configuration has changed
+        # asset_path is None for metadata computed from the input file, such as statistics
+        if not self.refresh_metadata or (asset_path is not None and not self.sink.exists(asset_path)):
+            return False
+        record = self.asset_manifest.get(item_path, {}).get(asset_name, None)
+        if record is None:
+            mtime = self.sink.getmtime(asset_path) if asset_path is not None else None
+            if mtime is None:
+                return False
+            # the asset was generated before changes were recorded, reuse it if it is newer than the input file
+            return mtime >= os.path.getmtime(input_filepath)
+        return record == {"input": file_fingerprint(input_filepath), "config": config_fingerprint(asset_config)}
+
+    def record_asset(self, item_path, asset_name, input_filepath, asset_config, generated=True):
+        # reused assets are recorded too, so that assets generated before the manifest existed (and reused based on
+        # their modification time) are regenerated by later runs if their configuration changes
+        self.asset_manifest.setdefault(item_path, {})[asset_name] = {
+            "input": file_fingerprint(input_filepath),
+            "config": config_fingerprint(asset_config)
+        }
+        self.changes["assets_generated" if generated else "assets_reused"] += 1
+
+    def validate(self):
+        # jsonschema is only needed if validation is requested
+        from .validation import validate_files, DEFAULT_SCHEMA_CACHE_FOLDER
+        paths = [self.collection_path] + self.item_paths
+        self.validation_report = validate_files(paths, cache_folder=self.schema_cache_folder or DEFAULT_SCHEMA_CACHE_FOLDER,
+                                                allow_download=self.download_schemas)
+        self.logger.info(f"Validated {self.validation_report['checked']} file(s), {self.validation_report['invalid']} invalid")
+        for (path, errors) in self.validation_report["errors"].items():
+            for error in errors:
+                self.logger.error(f"{path}: {error['schema']}: {error['path']}: {error['message']}")
+        for uri in self.validation_report["unavailable_schemas"]:
+            self.logger.warning(f"Schema {uri} is not available locally, files were not checked against it")
+        return self.validation_report
 
     def finalise_collection(self):
         spatial_extent = pystac.SpatialExtent([self.bbox])
         temporal_extent = pystac.TemporalExtent([self.start_date, self.end_date]) if self.climatology_interval is None else pystac.TemporalExtent(list(self.climatology_interval))
         extent = pystac.Extent(spatial_extent, temporal_extent)
         self.collection.extent = extent
-        with open(self.collection_path, "w") as f:
-            f.write(json.dumps(self.collection.to_dict(include_self_link=False), indent=4))
+        self.sink.write(self.collection_filename, json.dumps(self.collection.to_dict(include_self_link=False), indent=4))
+        self.publish(self.collection_filename)
+
+    def publish(self, *paths):
+        if self.publisher:
+            # the publisher uploads the local files, so they must be written first
+            self.sink.flush()
+            for path in paths:
+                if self.sink.exists(path):
+                    self.publisher.publish(self.sink.local_path(path))
 
     def process_item(self, fpath):
         input_filename = os.path.split(fpath)[-1]
@@ -266,7 +553,7 @@ class Netcdf2Stac:
         var_id = self.config["variable"]
         dset_id = self.config["dataset_id"]
 
-        i = NCFileInspector(fpath, var_id, self.config)
+        i = NCFileInspector(fpath, var_id, self.config, chunks=self.chunks, max_chunk_bytes=self.get_max_chunk_bytes())
         bbox = i.get_bbox()
 
         if self.bbox is None:
@@ -288,24 +575,44 @@ class Netcdf2Stac:
         dt = i.get_datetime(0)
 
         item_subfolder = expand_dt_template(self.item_subfolder,dt)
-        os.makedirs(os.path.join(self.base_folder, item_subfolder), exist_ok=True)
         item_subfolder_levels = len(item_subfolder.split("/"))
+        # paths of the generated files, relative to the root of the sink
         kerchunk_filename = os.path.splitext(input_filename)[0] + "-kerchunk.json"
-        kerchunk_filepath = os.path.join(self.base_folder, item_subfolder, kerchunk_filename)
+        kerchunk_path = os.path.join(item_subfolder, kerchunk_filename)
         output_filename = os.path.splitext(input_filename)[0] + ".geojson"
-        output_filepath = os.path.join(self.base_folder, item_subfolder, output_filename)
-        if not self.overwrite_items:
-            if os.path.exists(output_filepath):
-                if not self.generate_kerchunk_assets or os.path.exists(kerchunk_filepath):
+        item_path = os.path.join(item_subfolder, output_filename)
+        thumbnail_filename = os.path.splitext(input_filename)[0] + ".png"
+        thumbnail_path = os.path.join(item_subfolder, thumbnail_filename)
+        if not self.overwrite_items and not self.refresh_metadata:
+            if self.sink.exists(item_path):
+                if not self.generate_kerchunk_assets or self.sink.exists(kerchunk_path):
                     self.logger.info(f"Skipping item {fpath}, output already exists")
+                    if self.item_store or self.geoparquet_writer:
+                        # index the existing item, so that the store and dataset cover the whole catalogue
+                        existing_item = json.loads(self.sink.read(item_path))
+                        if self.item_store:
+                            self.item_store.add_item(existing_item, path=item_path)
+                        if self.geoparquet_writer:
+                            self.geoparquet_writer.add_item(existing_item, item_path=item_path)
+                    # files that are already published and unchanged are skipped by the publisher
+                    if self.generate_kerchunk_assets and not self.inline_kerchunk:
+                        self.publish(kerchunk_path)
+                    if self.thumbnail_generator:
+                        self.publish(thumbnail_path)
+                    self.publish(item_path)
                     return
 
+        existing_item = None
+        if (self.refresh_metadata or self.overwrite_items) and self.sink.exists(item_path):
+            existing_item = json.loads(self.sink.read(item_path))
+
         if self.start_date is None or dt < self.start_date:
             self.start_date = dt
         if self.end_date is None or dt > self.end_date:
             self.end_date = dt
 
-        item_id = str(uuid.uuid4())
+        # keep the id of a refreshed or overwritten item, so that catalogues see an update rather than a new item
+        item_id = existing_item["id"] if existing_item else str(uuid.uuid4())
 
         props = self.config.get("defaults", {}).get("item", {})
 
@@ -345,25 +652,50 @@ class Netcdf2Stac:
 
         item.clear_links()
 
-        if self.collection_path:
+        if self.collection_filename:
             superfolder = os.path.join(*([".."]*item_subfolder_levels))
             clink = pystac.Link(rel="collection", target=os.path.join(superfolder,self.collection_filename), media_type="application/json")
             item.add_link(clink)
 
+        raster_bands = None
+        if self.generate_statistics:
+            statistics_config = self.config.get("statistics", {})
+            existing_bands = None
+            for existing_asset in (existing_item or {}).get("assets", {}).values():
+                existing_bands = existing_bands or existing_asset.get("raster:bands", None)
+            if existing_bands and self.is_asset_current(item_path, "statistics", None, fpath, statistics_config):
+                raster_bands = existing_bands
+                self.record_asset(item_path, "statistics", fpath, statistics_config, generated=False)
+            else:
+                raster_bands = [get_band_statistics(i.get_variable(v), statistics_config.get("histogram_bins", None),
+                                                    statistics_config.get("histogram_range", None))
+                                for v in statistics_config.get("variables", [var_id])]
+                self.record_asset(item_path, "statistics", fpath, statistics_config)
+            item.stac_extensions.append(RASTER_EXTENSION)
+
         netcdf_filename = os.path.split(fpath)[-1]
         asset_dict = get_netcdf_asset_dict(netcdf_filename, self.config, dt)
         netcdf_href = asset_dict["href"]
 
         if self.generate_kerchunk_assets:
             kerchunk_asset_dict = get_kerchunk_asset_dict(kerchunk_filename, self.config, dt)
-
-            generate_kerchunk(fpath, netcdf_href, kerchunk_filepath)
+            if raster_bands:
+                kerchunk_asset_dict["raster:bands"] = raster_bands
+
+            kerchunk_config = {"url": netcdf_href, "inline_threshold": KERCHUNK_INLINE_THRESHOLD}
+            if self.is_asset_current(item_path, "kerchunk", kerchunk_path, fpath, kerchunk_config):
+                self.record_asset(item_path, "kerchunk", fpath, kerchunk_config, generated=False)
+                kerchunk_content = self.sink.read(kerchunk_path)
+            else:
+                kerchunk_content = generate_kerchunk(fpath, netcdf_href)
+                self.sink.write(kerchunk_path, kerchunk_content)
+                self.record_asset(item_path, "kerchunk", fpath, kerchunk_config)
             href = kerchunk_asset_dict["href"]
             del kerchunk_asset_dict["href"]
             if self.inline_kerchunk:
-                with open(kerchunk_filepath,"rb") as f:
-                    kerchunk_content = f.read()
-                    href = "data:application/json;base64,"+base64.b64encode(kerchunk_content).decode()
+                href = "data:application/json;base64,"+base64.b64encode(kerchunk_content).decode()
+            else:
+                self.publish(kerchunk_path)
             asset_key = "reference_file"
             kerchunk_asset = pystac.Asset(href=href,
                                  roles=["reference","data"],
@@ -374,6 +706,8 @@ class Netcdf2Stac:
         if self.generate_netcdf_assets:
             asset_key = os.path.splitext(netcdf_filename)[0]
             del asset_dict["href"]
+            if raster_bands:
+                asset_dict["raster:bands"] = raster_bands
             asset = pystac.Asset(href=netcdf_href,
                                  roles=["data"],
                                  media_type="application/netcdf",
@@ -381,21 +715,41 @@ class Netcdf2Stac:
             item.add_asset(asset_key,asset)
 
         if self.thumbnail_generator:
-            thumbnail_filename = os.path.splitext(input_filename)[0] + ".png"
-            thumbnail_filepath = os.path.join(self.base_folder, item_subfolder, thumbnail_filename)
             asset_dict = get_thumbnail_asset_dict(thumbnail_filename, self.config, dt)
             href = asset_dict["href"]
             del asset_dict["href"]
-            self.thumbnail_generator.generate(i.get_dataset(), thumbnail_filepath)
+            if self.is_asset_current(item_path, "thumbnail", thumbnail_path, fpath, self.config["thumbnail"]):
+                self.record_asset(item_path, "thumbnail", fpath, self.config["thumbnail"], generated=False)
+            else:
+                thumbnail = io.BytesIO()
+                self.thumbnail_generator.generate(i.get_dataset(), thumbnail)
+                self.sink.write(thumbnail_path, thumbnail.getvalue())
+                self.record_asset(item_path, "thumbnail", fpath, self.config["thumbnail"])
+            self.publish(thumbnail_path)
             asset = pystac.Asset(href=href,
                                  roles=["thumbnail"],
                                  media_type="image/png",
                                  extra_fields=asset_dict)
             item.add_asset("thumbnail", asset)
 
-        with open(output_filepath,"w") as f:
-            o = item.to_dict(include_self_link=False)
-            f.write(json.dumps(o,indent=4))
+        o = item.to_dict(include_self_link=False)
+        if json.loads(json.dumps(o)) == existing_item:
+            # leave unchanged items untouched
+            self.changes["items_unchanged"] += 1
+        else:
+            self.sink.write(item_path, json.dumps(o,indent=4))
+            self.changes["items_written"] += 1
+        self.publish(item_path)
+
+        if self.sink.local_path(item_path):
+            self.item_paths.append(self.sink.local_path(item_path))
+
+        if self.item_store:
+            self.item_store.add_item(o, path=item_path)
+            self.item_store.commit_periodically()
+
+        if self.geoparquet_writer:
+            self.geoparquet_writer.add_item(o, item_path=item_path)
 
 
 
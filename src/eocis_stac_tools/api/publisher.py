@@ -0,0 +1,158 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import concurrent.futures
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+import urllib.parse
+
+CONTENT_TYPES = {
+    ".geojson": "application/geo+json",
+    ".json": "application/json",
+    ".png": "image/png"
+}
+
+
+def md5(filepath):
+    h = hashlib.md5()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def get_content_type(filepath):
+    ext = os.path.splitext(filepath)[1].lower()
+    return CONTENT_TYPES.get(ext, None) or mimetypes.guess_type(filepath)[0] or "application/octet-stream"
+
+
+class HttpTarget:
+
+    def __init__(self, url, auth=None, max_connections=8):
+        import httpx
+        self.url = url.rstrip("/") + "/"
+        self.client = httpx.Client(auth=auth, timeout=180,
+                                   limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
+
+    def get_etag(self, key):
+        response = self.client.head(self.url + urllib.parse.quote(key))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.headers.get("ETag", None)
+
+    def put(self, key, filepath, content_type):
+        with open(filepath, "rb") as f:
+            response = self.client.put(self.url + urllib.parse.quote(key), content=f.read(),
+                                       headers={"Content-Type": content_type})
+        response.raise_for_status()
+
+    def close(self):
+        self.client.close()
+
+
+class S3Target:
+
+    def __init__(self, url, endpoint_url=None, max_connections=8):
+        # boto3 is only needed if publishing to S3
+        import boto3
+        import botocore.config
+        parsed = urllib.parse.urlparse(url)
+        self.bucket = parsed.netloc
+        self.prefix = parsed.path.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url,
+                                   config=botocore.config.Config(max_pool_connections=max_connections))
+
+    def get_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def get_etag(self, key):
+        import botocore.exceptions
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.get_key(key))["ETag"]
+        except botocore.exceptions.ClientError as exc:
+            if exc.response.get("Error", {}).get("Code", None) in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put(self, key, filepath, content_type):
+        with open(filepath, "rb") as f:
+            self.client.put_object(Bucket=self.bucket, Key=self.get_key(key), Body=f.read(), ContentType=content_type)
+
+    def close(self):
+        pass
+
+
+class Publisher:
+
+    def __init__(self, base_folder, target_url, auth=None, s3_endpoint_url=None, max_workers=8):
+        """
+        Upload files written under base_folder to an HTTP server (using PUT) or to an S3 compatible object store,
+        in background threads.  Files whose md5 matches the ETag of the existing object are not uploaded again.
+
+        :param base_folder: the local folder, files are uploaded to the same path relative to target_url
+        :param target_url: http(s)://host/path or s3://bucket/prefix
+        :param auth: authentication for HTTP targets, anything accepted by httpx
+        :param s3_endpoint_url: endpoint URL for S3 compatible object stores other than AWS
+        :param max_workers: the maximum number of concurrent uploads
+        """
+        self.base_folder = base_folder
+        if target_url.startswith("s3://"):
+            self.target = S3Target(target_url, endpoint_url=s3_endpoint_url, max_connections=max_workers)
+        else:
+            self.target = HttpTarget(target_url, auth=auth, max_connections=max_workers)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.summary = {"uploaded": 0, "skipped": 0, "failed": 0}
+        self.logger = logging.getLogger("Publisher")
+
+    def publish(self, filepath):
+        # queue a file for upload and return immediately
+        key = os.path.relpath(filepath, self.base_folder).replace(os.sep, "/")
+        self.executor.submit(self.upload, key, filepath)
+
+    def upload(self, key, filepath):
+        try:
+            etag = self.target.get_etag(key)
+            if etag is not None and etag.strip('"') == md5(filepath):
+                result = "skipped"
+            else:
+                self.target.put(key, filepath, get_content_type(filepath))
+                result = "uploaded"
+        except Exception as exc:
+            self.logger.error(f"Failed to publish {key}: {exc}")
+            result = "failed"
+        with self.lock:
+            self.summary[result] += 1
+
+    def close(self):
+        """
+        Wait for the queued uploads to finish
+
+        :return: dictionary with the number of files uploaded, skipped (already up to date) and failed
+        """
+        self.executor.shutdown(wait=True)
+        self.target.close()
+        return self.summary
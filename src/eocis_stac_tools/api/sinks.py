@@ -0,0 +1,285 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import io
+import json
+import os
+import sys
+import concurrent.futures
+import tarfile
+import threading
+import time
+import zipfile
+
+# size of the buffer used when writing archives
+BUFFER_SIZE = 1024 * 1024
+
+# the most content DirectorySink holds in memory while waiting for it to be written
+MAX_PENDING_BYTES = 64 * 1024 * 1024
+
+
+def to_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+def normalise_path(path):
+    # the name of a file within an archive or memory sink
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+class Sink:
+    """
+    Destination for the files generated by Netcdf2Stac, addressed by paths relative to the root of the output.
+
+    Sinks other than DirectorySink only hold the files written during the current run, so existing outputs are
+    never found and every item is generated.
+    """
+
+    # whether files written in an earlier run can be read back, and so are worth keeping state for
+    persistent = False
+
+    def write(self, path, content):
+        raise NotImplementedError()
+
+    def exists(self, path):
+        return False
+
+    def read(self, path):
+        return None
+
+    def getmtime(self, path):
+        return None
+
+    def local_path(self, path):
+        # the path to the file on the local filesystem, if the sink writes files there
+        return None
+
+    def flush(self):
+        # wait until the files written so far can be found at their local paths
+        pass
+
+    def close(self):
+        pass
+
+
+class DirectorySink(Sink):
+
+    persistent = True
+
+    def __init__(self, folder, max_pending_bytes=MAX_PENDING_BYTES):
+        """
+        Write files to a folder.  Files are written by a background thread, so that processing continues while they are
+        written to (possibly slow, shared) storage.  Files not yet written are read back from memory.
+
+        :param folder: the folder to write files to
+        :param max_pending_bytes: the most content to hold in memory, writes wait for the background thread beyond this
+        """
+        self.folder = folder
+        self.max_pending_bytes = max_pending_bytes
+        # folders already created during this run, so that os.makedirs is called once per folder rather than per file
+        self.created_folders = set()
+        # content waiting to be written, by path
+        self.pending = {}
+        self.pending_bytes = 0
+        self.error = None
+        self.condition = threading.Condition()
+        self.executor = None
+
+    def local_path(self, path):
+        return os.path.join(self.folder, path)
+
+    def check_error(self):
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def write(self, path, content):
+        content = to_bytes(content)
+        with self.condition:
+            self.check_error()
+            self.condition.wait_for(lambda: self.pending_bytes == 0 or
+                                    self.pending_bytes + len(content) <= self.max_pending_bytes)
+            previous = self.pending.get(path, None)
+            self.pending_bytes += len(content) - (len(previous) if previous is not None else 0)
+            self.pending[path] = content
+        if self.executor is None:
+            # a single thread writes the files in the order they were written to the sink
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.executor.submit(self.write_pending, path)
+
+    def write_pending(self, path):
+        with self.condition:
+            content = self.pending.get(path, None)
+        if content is None:
+            # already written by an earlier task for the same path
+            return
+        try:
+            filepath = self.local_path(path)
+            folder = os.path.dirname(filepath)
+            if folder not in self.created_folders:
+                os.makedirs(folder, exist_ok=True)
+                self.created_folders.add(folder)
+            with open(filepath, "wb") as f:
+                f.write(content)
+        except Exception as exc:
+            with self.condition:
+                self.error = self.error or exc
+        finally:
+            with self.condition:
+                # the path may have been written again meanwhile, in which case that write is still pending
+                if self.pending.get(path, None) is content:
+                    del self.pending[path]
+                    self.pending_bytes -= len(content)
+                self.condition.notify_all()
+
+    def exists(self, path):
+        with self.condition:
+            if path in self.pending:
+                return True
+        return os.path.exists(self.local_path(path))
+
+    def read(self, path):
+        with self.condition:
+            if path in self.pending:
+                return self.pending[path]
+        if not os.path.exists(self.local_path(path)):
+            return None
+        with open(self.local_path(path), "rb") as f:
+            return f.read()
+
+    def getmtime(self, path):
+        with self.condition:
+            if path in self.pending:
+                return time.time()
+        return os.path.getmtime(self.local_path(path)) if os.path.exists(self.local_path(path)) else None
+
+    def flush(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.pending)
+            self.check_error()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+
+class ArchiveSink(Sink):
+
+    def __init__(self, archive_path):
+        """
+        Write all files to a single archive, a zip file if archive_path ends with .zip, otherwise a tar file which is
+        compressed if archive_path ends with .gz/.tgz, .bz2 or .xz.  The archive is created when the first file is
+        written (or when the sink is closed), so that a run which fails to start leaves no archive behind.
+
+        :param archive_path: path of the archive to create, any existing archive is replaced
+        """
+        self.archive_path = archive_path
+        self.file = None
+        self.zip = None
+        self.tar = None
+
+    def open(self):
+        # the archive is written through a large buffer, rather than with a system call for each small write
+        self.file = open(self.archive_path, "wb", buffering=BUFFER_SIZE)
+        if self.archive_path.endswith(".zip"):
+            self.zip = zipfile.ZipFile(self.file, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            mode = "w"
+            for (ext, compression) in [(".gz", "gz"), (".tgz", "gz"), (".bz2", "bz2"), (".xz", "xz")]:
+                if self.archive_path.endswith(ext):
+                    mode = "w:" + compression
+            self.tar = tarfile.open(fileobj=self.file, mode=mode)
+
+    def write(self, path, content):
+        if self.file is None:
+            self.open()
+        content = to_bytes(content)
+        name = normalise_path(path)
+        if self.zip:
+            self.zip.writestr(name, content)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            self.tar.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        if self.file is None:
+            self.open()
+        if self.zip:
+            self.zip.close()
+        else:
+            self.tar.close()
+        self.file.close()
+
+
+class MemorySink(Sink):
+
+    def __init__(self):
+        # map from path to file content (bytes)
+        self.files = {}
+
+    def write(self, path, content):
+        self.files[normalise_path(path)] = to_bytes(content)
+
+    def exists(self, path):
+        return normalise_path(path) in self.files
+
+    def read(self, path):
+        return self.files.get(normalise_path(path), None)
+
+
+class NDJSONSink(Sink):
+
+    def __init__(self, stream=None, batch_size=100):
+        """
+        Write STAC items and collections as newline delimited JSON, one object per line, ignoring other files
+        (such as kerchunk files and thumbnails).  Lines are written in batches.
+
+        :param stream: text stream to write to, defaults to stdout
+        :param batch_size: the number of lines to collect before writing them
+        """
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self.lines = []
+
+    def write(self, path, content):
+        if not path.endswith((".json", ".geojson")):
+            return
+        o = json.loads(content)
+        if isinstance(o, dict) and o.get("type", None) in ("Feature", "Collection"):
+            self.lines.append(json.dumps(o) + "\n")
+            if len(self.lines) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        self.stream.write("".join(self.lines))
+        self.stream.flush()
+        self.lines = []
+
+    def close(self):
+        self.flush()
@@ -52,7 +52,8 @@ class Thumbnail:
                 self.cmap_colours.append(f"#{r:02X}{g:02X}{b:02X}")
 
 
-    def generate(self, dataset, output_path):
+    def generate(self, dataset, output):
+        # output is a path or a binary file object to write the PNG image to
         da = dataset[self.variable]
 
         da = da.squeeze()
@@ -68,6 +69,15 @@ class Thumbnail:
                          x_range=(float(da[self.x_coord].min()), float(da[self.x_coord].max())),
                          y_range=(float(da[self.y_coord].min()), float(da[self.y_coord].max())))
 
+        if da.chunks is not None:
+            # the variable was opened with dask - read it chunk by chunk, keeping only every n'th pixel so that the
+            # array loaded into memory is not much larger than the plot.  Rasterising the dask array directly would
+            # leave seams at the chunk boundaries when interpolating.
+            stride = max(1, min(h // plot_height, w // self.plot_width))
+            if stride > 1:
+                da = da.isel({da.dims[0]: slice(None, None, stride), da.dims[1]: slice(None, None, stride)})
+            da = da.compute()
+
         agg = cvs.raster(da.squeeze(), agg=rd.first, interpolate='linear')
 
         shaded = tf.shade(agg, cmap=self.cmap_colours,
@@ -75,7 +85,10 @@ class Thumbnail:
                           span=(self.vmin, self.vmax))
 
         p = shaded.to_pil()
-        with open(output_path, "wb") as f:
-            p.save(f, format="PNG")
+        if isinstance(output, str):
+            with open(output, "wb") as f:
+                p.save(f, format="PNG")
+        else:
+            p.save(output, format="PNG")
 
 
@@ -0,0 +1,216 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import urllib.parse
+import urllib.request
+
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import best_match
+from referencing import Registry, Resource
+from referencing.exceptions import NoSuchResource
+from referencing.jsonschema import DRAFT7
+
+DEFAULT_SCHEMA_CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".cache", "eocis-stac-tools", "schemas")
+
+CORE_SCHEMA_PATHS = {
+    "Feature": "item-spec/json-schema/item.json",
+    "Collection": "collection-spec/json-schema/collection.json",
+    "Catalog": "catalog-spec/json-schema/catalog.json"
+}
+
+# the maximum number of errors to report for each file
+MAX_ERRORS_PER_FILE = 20
+
+
+class SchemaUnavailable(Exception):
+    pass
+
+
+def get_pystac_schemas():
+    # recent versions of pystac bundle the core STAC and GeoJSON schemas for the STAC version they support
+    try:
+        from pystac.validation.local_validator import get_local_schema_cache
+        return get_local_schema_cache()
+    except Exception:
+        return {}
+
+
+class SchemaStore:
+
+    def __init__(self, cache_folder=DEFAULT_SCHEMA_CACHE_FOLDER, allow_download=False):
+        """
+        Look up JSON schemas by URI, without network access unless allow_download is set
+
+        Schemas are searched for in the schemas bundled with pystac and then in the cache folder.  If allow_download is
+        set, any schemas still not found are downloaded and saved to the cache folder, so that the cache can be populated
+        on a node with network access and copied to others.  Otherwise get_schema raises SchemaUnavailable.
+
+        :param cache_folder: folder to cache schemas in, stored as <host>/<path>
+        :param allow_download: whether to download schemas that are not found locally
+        """
+        self.cache_folder = cache_folder
+        self.allow_download = allow_download
+        self.schemas = get_pystac_schemas()
+        self.validators = {}
+        # extension schemas that could not be found, files are validated against their other schemas
+        self.unavailable = set()
+        self.registry = Registry(retrieve=self.retrieve)
+
+    def local_path(self, folder, uri):
+        parsed = urllib.parse.urlparse(uri)
+        return os.path.join(folder, parsed.netloc, *parsed.path.strip("/").split("/"))
+
+    def get_schema(self, uri):
+        uri = uri.split("#")[0]
+        if uri in self.schemas:
+            return self.schemas[uri]
+
+        schema = None
+        if self.cache_folder and os.path.isfile(self.local_path(self.cache_folder, uri)):
+            with open(self.local_path(self.cache_folder, uri)) as f:
+                schema = json.loads(f.read())
+
+        if schema is None and self.allow_download:
+            with urllib.request.urlopen(uri, timeout=60) as response:
+                content = response.read()
+            schema = json.loads(content)
+            if self.cache_folder:
+                cache_path = self.local_path(self.cache_folder, uri)
+                os.makedirs(os.path.split(cache_path)[0], exist_ok=True)
+                # other worker processes may be caching the same schema, write to a temporary file then rename
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, cache_path)
+
+        if schema is None:
+            raise SchemaUnavailable(f"schema {uri} is not available locally")
+
+        self.schemas[uri] = schema
+        return schema
+
+    def retrieve(self, uri):
+        try:
+            return Resource.from_contents(self.get_schema(uri), default_specification=DRAFT7)
+        except Exception as exc:
+            raise NoSuchResource(ref=uri) from exc
+
+    def get_validator(self, uri):
+        # compile each validator once, they are reused for every file checked
+        if uri not in self.validators:
+            self.validators[uri] = Draft7Validator(self.get_schema(uri), registry=self.registry)
+        return self.validators[uri]
+
+
+def get_schema_uris(o):
+    stac_type = o.get("type", None)
+    if stac_type not in CORE_SCHEMA_PATHS:
+        raise Exception(f"unknown STAC object type {stac_type}")
+    core_uri = f"https://schemas.stacspec.org/v{o.get('stac_version', '1.0.0')}/{CORE_SCHEMA_PATHS[stac_type]}"
+    return [core_uri] + list(o.get("stac_extensions", []))
+
+
+def validate_object(store, o):
+    errors = []
+    uris = get_schema_uris(o)
+    for uri in uris:
+        try:
+            validator = store.get_validator(uri)
+            for error in validator.iter_errors(o):
+                # for errors from oneOf/anyOf, report the most relevant underlying error
+                error = best_match([error])
+                errors.append({"schema": uri, "path": "/".join(str(p) for p in error.absolute_path), "message": error.message})
+        except SchemaUnavailable as exc:
+            if uri == uris[0]:
+                # without the core schema, the file cannot be validated at all
+                errors.append({"schema": uri, "path": "", "message": str(exc)})
+            else:
+                # a missing extension schema is reported separately rather than making every file using it invalid
+                store.unavailable.add(uri)
+        except Exception as exc:
+            errors.append({"schema": uri, "path": "", "message": str(exc)})
+    return errors
+
+
+def validate_file(store, path):
+    try:
+        with open(path) as f:
+            o = json.loads(f.read())
+        return validate_object(store, o)
+    except Exception as exc:
+        return [{"schema": None, "path": "", "message": str(exc)}]
+
+
+# each worker process keeps its own schema store, so schemas are loaded and validators compiled once per worker
+worker_store = None
+
+def init_worker(cache_folder, allow_download):
+    global worker_store
+    worker_store = SchemaStore(cache_folder=cache_folder, allow_download=allow_download)
+
+def validate_files_in_worker(paths):
+    return ([(path, validate_file(worker_store, path)) for path in paths], sorted(worker_store.unavailable))
+
+
+def validate_files(paths, cache_folder=DEFAULT_SCHEMA_CACHE_FOLDER, allow_download=False, max_workers=None, batch_size=100):
+    """
+    Validate STAC item/collection files in parallel, collecting the errors rather than stopping at the first invalid file
+
+    :param paths: list of paths to STAC JSON files
+    :param cache_folder: folder used to cache schemas
+    :param allow_download: whether to download schemas that are not found locally
+    :param max_workers: number of worker processes to use, defaults to the number of CPUs
+    :param batch_size: number of files to pass to a worker at a time
+    :return: a report dictionary, with the number of files checked/valid/invalid, the errors for each invalid file,
+             a count of how many files each distinct error occurred in and the extension schemas that were not available
+             (files are validated against their other schemas)
+    """
+    paths = list(paths)
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+
+    errors = {}
+    error_counts = collections.Counter()
+    unavailable = set()
+    # spawn the workers rather than forking, the calling process may have other threads running (for example, dask)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=init_worker, initargs=(cache_folder, allow_download)) as executor:
+        for (results, unavailable_schemas) in executor.map(validate_files_in_worker, batches):
+            unavailable.update(unavailable_schemas)
+            for (path, file_errors) in results:
+                if file_errors:
+                    errors[path] = file_errors[:MAX_ERRORS_PER_FILE]
+                    error_counts.update(set(f"{e['schema']}: {e['message']}" for e in file_errors))
+
+    return {
+        "checked": len(paths),
+        "valid": len(paths) - len(errors),
+        "invalid": len(errors),
+        "errors": errors,
+        "error_counts": dict(error_counts.most_common()),
+        "unavailable_schemas": sorted(unavailable)
+    }
+
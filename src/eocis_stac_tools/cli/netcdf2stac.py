@@ -26,9 +26,9 @@ Generate STAC item records from EOCIS datasets
 
 Based on: https://github.com/EO-DataHub/eodh-eocis-sprint
 """
+import json
 import logging
-
-from ..api.netcdf2stac import Netcdf2Stac
+import sys
 
 def main():
     logging.basicConfig(level=logging.INFO)
@@ -42,16 +42,87 @@ def main():
     parser.add_argument("--include-kerchunk", action="store_true", help="generate a kerchunk file for each item")
     parser.add_argument("--inline-kerchunk", action="store_true", help="inline kerchunk into each STAC item")
     parser.add_argument("--include-thumbnails", action="store_true", help="generate a thumbnail image for each item")
+    parser.add_argument("--include-statistics", action="store_true", help="add statistics for each variable to the data assets of each item")
     parser.add_argument("--overwrite-items", action="store_true", help="overwrite item/kerchunk files if they already exist")
+    parser.add_argument("--refresh-metadata", action="store_true", help="regenerate item/collection files, reusing kerchunk/thumbnail files whose input and configuration are unchanged")
+    parser.add_argument("--chunks", help="read variables chunk by chunk using dask, either \"auto\" or chunk sizes for each dimension, for example lat=1000,lon=1000", default=None)
+    parser.add_argument("--memory-limit", help="approximate memory ceiling for chunked reads, for example 2GB (implies --chunks auto if --chunks is not specified, otherwise reduces chunk sizes to fit)", default=None)
+    parser.add_argument("--dask-threads", type=int, help="number of threads used for chunked reads, defaults to the number of CPUs", default=None)
+    parser.add_argument("--publish-url", help="upload generated files to this http(s):// (using PUT) or s3:// URL as they are written", default=None)
+    parser.add_argument("--publish-username", help="username for HTTP basic authentication when publishing", default=None)
+    parser.add_argument("--publish-password", help="password for HTTP basic authentication when publishing", default=None)
+    parser.add_argument("--publish-s3-endpoint", help="endpoint URL of an S3 compatible object store", default=None)
+    parser.add_argument("--publish-workers", type=int, help="maximum number of concurrent uploads", default=8)
+    parser.add_argument("--validate", action="store_true", help="validate the collection and generated items against their JSON schemas")
+    parser.add_argument("--validation-report", help="path to write a JSON validation report to", default=None)
+    parser.add_argument("--schema-cache", help="folder used to cache JSON schemas for validation", default=None)
+    parser.add_argument("--download-schemas", action="store_true", help="download (and cache) any schemas needed for validation that are not cached")
+    parser.add_argument("--geoparquet", help="path of a stac-geoparquet folder (relative to the base folder) to append generated items to", default=None)
+    parser.add_argument("--item-store", help="path of a SQLite database (relative to the base folder) to index generated items into", default=None)
+    parser.add_argument("--output-archive", help="write all generated files to a single .zip, .tar, .tar.gz, .tar.bz2 or .tar.xz archive instead of the base folder", default=None)
+    parser.add_argument("--output-ndjson", action="store_true", help="write the collection and items to stdout as newline delimited JSON instead of the base folder")
 
     args = parser.parse_args()
+
+    if args.output_archive and args.output_ndjson:
+        parser.error("--output-archive and --output-ndjson cannot be used together")
+    if not args.base_folder and not (args.output_archive or args.output_ndjson):
+        parser.error("--base-folder is required unless --output-archive or --output-ndjson is used")
+    if args.output_archive or args.output_ndjson:
+        # publishing and validation read the generated files from the base folder
+        for (option, value) in [("--publish-url", args.publish_url), ("--validate", args.validate)]:
+            if value:
+                parser.error(f"{option} cannot be used with --output-archive or --output-ndjson")
+    if not args.base_folder:
+        # the item store and geoparquet dataset are written to the base folder
+        for (option, value) in [("--item-store", args.item_store), ("--geoparquet", args.geoparquet)]:
+            if value:
+                parser.error(f"{option} requires --base-folder")
+
+    # imported after parsing the arguments, so that --help does not wait for the processing dependencies to load
+    from ..api.netcdf2stac import Netcdf2Stac
+
+    chunks = args.chunks
+    if chunks and chunks != "auto":
+        chunks = {dim: int(size) for (dim, size) in (part.split("=") for part in chunks.split(","))}
+
+    sink = None
+    if args.output_archive:
+        from ..api.sinks import ArchiveSink
+        sink = ArchiveSink(args.output_archive)
+    elif args.output_ndjson:
+        from ..api.sinks import NDJSONSink
+        sink = NDJSONSink()
+
     converter = Netcdf2Stac(base_folder=args.base_folder, input_paths=args.input_paths,
                             collection_filename=args.collection_filename, item_subfolder=args.item_subfolder,
                             config_paths=args.config_paths, generate_kerchunk_assets=args.include_kerchunk,
                             inline_kerchunk=args.inline_kerchunk,
-                            generate_thumbnail_assets=args.include_thumbnails, overwrite_items=args.overwrite_items)
+                            generate_thumbnail_assets=args.include_thumbnails, overwrite_items=args.overwrite_items,
+                            refresh_metadata=args.refresh_metadata,
+                            item_store_path=args.item_store, geoparquet_path=args.geoparquet,
+                            validate_output=args.validate, schema_cache_folder=args.schema_cache,
+                            download_schemas=args.download_schemas, chunks=chunks, memory_limit=args.memory_limit,
+                            dask_threads=args.dask_threads, publish_url=args.publish_url,
+                            publish_auth=(args.publish_username, args.publish_password) if args.publish_username else None,
+                            publish_s3_endpoint_url=args.publish_s3_endpoint, publish_workers=args.publish_workers,
+                            generate_statistics=args.include_statistics, sink=sink)
     converter.run()
 
+    failed = False
+    if converter.validation_report:
+        if args.validation_report:
+            with open(args.validation_report, "w") as f:
+                f.write(json.dumps(converter.validation_report, indent=4))
+        if converter.validation_report["invalid"]:
+            failed = True
+
+    if converter.publish_summary and converter.publish_summary["failed"]:
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
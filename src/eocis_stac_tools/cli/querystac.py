@@ -0,0 +1,83 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Index STAC item files into a local SQLite item store and search it
+"""
+import glob
+import json
+
+from ..api.item_store import ItemStore
+
+def parse_property(s):
+    if "=" not in s:
+        raise Exception(f"property filter {s} should be of the form name=value")
+    (key, value) = s.split("=", 1)
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    return key, value
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="path to the SQLite item store", required=True)
+    parser.add_argument("--index", nargs="+", help="path(s) or pattern(s) of STAC item file(s) to add to the store")
+    parser.add_argument("--collections", nargs="+", help="only return items from these collection(s)")
+    parser.add_argument("--ids", nargs="+", help="only return items with these id(s)")
+    parser.add_argument("--bbox", nargs=4, type=float, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+                        help="only return items intersecting this bounding box")
+    parser.add_argument("--datetime", help="only return items intersecting this datetime or interval, eg 2023-01-01T00:00:00Z/2023-01-04T23:59:59Z")
+    parser.add_argument("--property", nargs="+", help="only return items with matching property values, eg day_of_year=1")
+    parser.add_argument("--limit", type=int, help="maximum number of items to return", default=None)
+    parser.add_argument("--output", choices=["json", "ids"], help="print matching items as JSON (one per line) or just their ids", default="json")
+
+    args = parser.parse_args()
+
+    store = ItemStore(args.db)
+
+    if args.index:
+        for pattern in args.index:
+            for path in glob.glob(pattern, recursive=True):
+                store.add_item_file(path)
+        store.commit()
+
+    properties = dict(parse_property(p) for p in args.property) if args.property else None
+
+    if args.index and not (args.collections or args.ids or args.bbox or args.datetime or properties):
+        store.close()
+        return
+
+    for item in store.search(collections=args.collections, ids=args.ids, bbox=args.bbox, datetime=args.datetime,
+                             properties=properties, limit=args.limit):
+        if args.output == "ids":
+            print(item["id"])
+        else:
+            print(json.dumps(item))
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Convert existing STAC item files to a stac-geoparquet dataset
+"""
+import glob
+import logging
+
+from ..api.geoparquet import GeoParquetWriter
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-paths", nargs="+", help="path(s) or pattern(s) of STAC item file(s)", required=True)
+    parser.add_argument("--output-path", help="folder to write (or append to) the stac-geoparquet dataset", required=True)
+
+    args = parser.parse_args()
+    writer = GeoParquetWriter(args.output_path)
+    count = 0
+    for pattern in args.input_paths:
+        for path in glob.glob(pattern, recursive=True):
+            if writer.add_item_file(path):
+                count += 1
+    writer.flush()
+    logging.getLogger("stac2geoparquet").info(f"Converted {count} item(s) to {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,13 +25,74 @@ import json
 from urllib.parse import urljoin
 
 import argparse
-import httpx
-from httpx_auth import OAuth2ClientCredentials
+import concurrent.futures
+import gzip
+import hashlib
 import glob
+import threading
 import time
 
 API_URL=""
 
+# compression applied to request bodies, None, "gzip" or "zstd"
+COMPRESSION=None
+
+class TransferStats:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+
+    def add(self, bytes_sent, bytes_uncompressed):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += bytes_sent
+            self.bytes_uncompressed += bytes_uncompressed
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        return (f"sent {self.bytes_sent} bytes ({self.bytes_uncompressed} uncompressed) in {self.requests} request(s), "
+                f"{elapsed:.1f}s, {self.bytes_sent / elapsed:.0f} bytes/s")
+
+TRANSFER_STATS = TransferStats()
+
+def compress(content, encoding):
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=6)
+    if encoding == "zstd":
+        # zstandard is only needed if zstd compression is requested
+        import zstandard
+        return zstandard.ZstdCompressor().compress(content)
+    raise Exception(f"unsupported compression {encoding}")
+
+def send_json(client, method, url, content):
+    """
+    Send a JSON request body, compressed with COMPRESSION if set.  If the server rejects a compressed body but
+    accepts the same body uncompressed, compression is turned off for subsequent requests.
+    """
+    global COMPRESSION
+    content = content.encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    encoding = COMPRESSION
+    if encoding:
+        compressed = compress(content, encoding)
+        response = client.request(method, url, content=compressed, headers=dict(headers, **{"Content-Encoding": encoding}))
+        TRANSFER_STATS.add(len(compressed), len(content))
+        if response.status_code not in (400, 415):
+            return response
+    response = client.request(method, url, content=content, headers=headers)
+    TRANSFER_STATS.add(len(content), len(content))
+    if encoding and response.is_success and COMPRESSION == encoding:
+        print(f"server does not accept {encoding} compressed requests, sending uncompressed requests")
+        COMPRESSION = None
+    return response
+
 def get_collections(client):
     return client.get(
         urljoin(API_URL, f"collections")
@@ -85,23 +146,30 @@ def get_collection(client,collection_id):
 
     return response.is_success
 
-def add_items(client,item_path):
+def add_items(client,item_path,concurrency=8):
 
     item_paths = glob.glob(item_path, recursive=True)
-    for path in item_paths:
+
+    def add_item(path):
         with open(path, encoding="utf-8") as f:
             data = json.load(f)
 
-        response = client.post(
-            urljoin(API_URL, f"collections/{data['collection']}/items"),
-            content=json.dumps(data)
-        )
+        response = send_json(client, "POST", urljoin(API_URL, f"collections/{data['collection']}/items"), json.dumps(data))
 
         print(response.content)
-        if not response.is_success:
-            return False
+        return response.is_success
 
-    return True
+    if not item_paths:
+        return True
+
+    # send the first item on its own, so that a server which rejects compressed requests is detected before the rest
+    # are sent, then send the others concurrently to make use of the connection pool (and HTTP/2 multiplexing)
+    if not add_item(item_paths[0]):
+        return False
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(add_item, item_paths[1:]))
+
+    return all(results)
 
 def get_items(client,collection_id):
     response = client.get(
@@ -150,6 +218,101 @@ def remove_items(client,item_paths):
     return True
 
 
+def get_item_fingerprint(item, compare="hash"):
+    # fingerprint used to decide whether a local item differs from the remote copy, None if it cannot be compared
+    if compare == "updated":
+        return item.get("properties", {}).get("updated", None)
+    # links are rewritten by the server, so leave them out when hashing the content
+    content = {k: v for (k, v) in item.items() if k != "links"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+def is_changed(local_fingerprint, remote_fingerprint):
+    # items without an updated property cannot be shown to be unchanged, so they are always sent
+    return local_fingerprint is None or remote_fingerprint is None or local_fingerprint != remote_fingerprint
+
+def iter_remote_items(client, collection_id, page_size=500):
+    # stream the items in a collection, following the "next" links page by page
+    response = client.get(urljoin(API_URL, f"collections/{collection_id}/items"), params={"limit": page_size})
+    while True:
+        if response.status_code == 404:
+            return
+        response.raise_for_status()
+        page = response.json()
+        for item in page.get("features", []):
+            yield item
+        next_links = [link for link in page.get("links", []) if link.get("rel", None) == "next"]
+        if not page.get("features", []) or not next_links:
+            return
+        link = next_links[0]
+        if link.get("method", "GET") == "POST":
+            response = client.post(link["href"], json=link.get("body", {}))
+        else:
+            response = client.get(link["href"])
+
+def sync_items(client, item_path, compare="hash", concurrency=8, delete_orphans=True, dry_run=False):
+    """
+    Make the items in the catalogue match a local item tree: POST items that are not in the catalogue,
+    PUT items whose content (or updated timestamp) differs and DELETE catalogue items with no local copy
+
+    :param client: httpx client for the catalogue
+    :param item_path: glob pattern matching the local item files
+    :param compare: "hash" to compare item content, "updated" to compare the updated property (items without it
+                    are treated as changed)
+    :param concurrency: the maximum number of requests in flight at once
+    :param delete_orphans: whether to delete catalogue items that have no local copy
+    :param dry_run: report what would change without modifying the catalogue
+    :return: dictionary with the counts of items added, updated, deleted, unchanged and failed
+    """
+    # only the path and fingerprint of each item is held in memory, not the item content
+    local = {}
+    for path in glob.glob(item_path, recursive=True):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("type", None) != "Feature":
+            continue
+        local.setdefault(data["collection"], {})[data["id"]] = (path, get_item_fingerprint(data, compare))
+
+    requests = []
+    counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+    for (collection_id, local_items) in local.items():
+        remote_ids = set()
+        for item in iter_remote_items(client, collection_id):
+            remote_ids.add(item["id"])
+            if item["id"] not in local_items:
+                if delete_orphans:
+                    requests.append(("deleted", "DELETE", f"collections/{collection_id}/items/{item['id']}", None))
+            elif is_changed(local_items[item["id"]][1], get_item_fingerprint(item, compare)):
+                requests.append(("updated", "PUT", f"collections/{collection_id}/items/{item['id']}", local_items[item["id"]][0]))
+            else:
+                counts["unchanged"] += 1
+        for (item_id, (path, _)) in local_items.items():
+            if item_id not in remote_ids:
+                requests.append(("added", "POST", f"collections/{collection_id}/items", path))
+
+    def send(request):
+        (action, method, url, path) = request
+        if path is not None:
+            with open(path, encoding="utf-8") as f:
+                response = send_json(client, method, urljoin(API_URL, url), f.read())
+        else:
+            response = client.request(method, urljoin(API_URL, url))
+        if not response.is_success:
+            print(f"{method} {url} failed: {response.content}")
+        return (action, response.is_success)
+
+    if dry_run:
+        for (action, method, url, path) in requests:
+            print(f"{method} {url}")
+            counts[action] += 1
+        return counts
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for (action, success) in executor.map(send, requests):
+            counts[action if success else "failed"] += 1
+
+    return counts
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--url", required=True)
@@ -167,11 +330,27 @@ def main():
     parser.add_argument("--add-items")
     parser.add_argument("--remove-items", nargs="+")
     parser.add_argument("--list-collections", action="store_true")
+    parser.add_argument("--sync", help="make the catalogue items match the items matching this glob pattern")
+    parser.add_argument("--sync-compare", choices=["hash", "updated"], default="hash",
+                        help="compare items by content hash or by their updated property")
+    parser.add_argument("--sync-keep-orphans", action="store_true", help="do not delete catalogue items with no local copy")
+    parser.add_argument("--dry-run", action="store_true", help="with --sync, print the changes without making them")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum number of concurrent requests")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], default=None,
+                        help="compress item request bodies, if the server accepts compressed requests")
+    parser.add_argument("--http2", action="store_true", help="use HTTP/2, multiplexing requests over each connection (requires h2)")
+    parser.add_argument("--max-connections", type=int, default=100, help="maximum number of pooled connections")
+    parser.add_argument("--max-keepalive-connections", type=int, default=20, help="maximum number of idle connections to keep alive")
+    parser.add_argument("--keepalive-expiry", type=float, default=5.0, help="seconds to keep idle connections alive")
 
     args = parser.parse_args()
 
-    global API_URL
+    # imported after parsing the arguments, so that --help starts quickly
+    import httpx
+
+    global API_URL, COMPRESSION
     API_URL = args.url
+    COMPRESSION = args.compress
 
     if args.basicauth_username and args.basicauth_password:
         auth = httpx.BasicAuth(username=args.basicauth_username, password=args.basicauth_password)
@@ -179,6 +358,7 @@ def main():
         print(f"tokenurl={args.oauth2_tokenurl}")
         print(f"client_id={args.oauth2_clientid}")
         print(f"client_secret={args.oauth2_clientsecret}")
+        from httpx_auth import OAuth2ClientCredentials
         auth = OAuth2ClientCredentials(
             token_url=args.oauth2_tokenurl,
             client_id=args.oauth2_clientid,
@@ -191,6 +371,10 @@ def main():
         auth=auth,
         verify=False,
         timeout=180,
+        http2=args.http2,
+        limits=httpx.Limits(max_connections=args.max_connections,
+                            max_keepalive_connections=args.max_keepalive_connections,
+                            keepalive_expiry=args.keepalive_expiry)
     )
 
     if args.remove_collection:
@@ -212,9 +396,20 @@ def main():
         add_items(client,args.remove_items)
 
     if args.add_items:
-        result = add_items(client,args.add_items)
+        TRANSFER_STATS.start()
+        result = add_items(client,args.add_items,concurrency=args.concurrency)
         if not result:
             print("add_items failed")
+        print(TRANSFER_STATS.summary())
+
+    if args.sync:
+        TRANSFER_STATS.start()
+        counts = sync_items(client, args.sync, compare=args.sync_compare, concurrency=args.concurrency,
+                            delete_orphans=not args.sync_keep_orphans, dry_run=args.dry_run)
+        print(json.dumps(counts))
+        print(TRANSFER_STATS.summary())
+        if counts["failed"]:
+            print("sync failed")
 
     if args.list_collections:
         response = get_collections(client)
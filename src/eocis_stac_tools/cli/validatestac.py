@@ -0,0 +1,69 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+"""
+Validate STAC item and collection files against their JSON schemas, without network access
+"""
+import glob
+import json
+import sys
+
+from ..api.validation import validate_files, DEFAULT_SCHEMA_CACHE_FOLDER
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-paths", nargs="+", help="path(s) or pattern(s) of STAC item/collection file(s)", required=True)
+    parser.add_argument("--schema-cache", help="folder used to cache JSON schemas", default=DEFAULT_SCHEMA_CACHE_FOLDER)
+    parser.add_argument("--download-schemas", action="store_true", help="download (and cache) any schemas that are not cached")
+    parser.add_argument("--workers", type=int, help="number of worker processes, defaults to the number of CPUs", default=None)
+    parser.add_argument("--report", help="path to write a JSON validation report to", default=None)
+
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.input_paths:
+        paths += glob.glob(pattern, recursive=True)
+
+    report = validate_files(paths, cache_folder=args.schema_cache, allow_download=args.download_schemas,
+                            max_workers=args.workers)
+
+    for (path, errors) in report["errors"].items():
+        for error in errors:
+            print(f"{path}: {error['schema']}: {error['path']}: {error['message']}")
+    for (error, count) in report["error_counts"].items():
+        print(f"{count} file(s): {error}")
+    for uri in report["unavailable_schemas"]:
+        print(f"schema {uri} is not available locally, use --download-schemas to cache it")
+    print(f"checked={report['checked']} valid={report['valid']} invalid={report['invalid']}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(json.dumps(report, indent=4))
+
+    if report["invalid"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
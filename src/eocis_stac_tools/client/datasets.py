@@ -0,0 +1,158 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 National Centre for Earth Observation
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import base64
+import collections
+import concurrent.futures
+import json
+import threading
+import urllib.parse
+
+import fsspec
+import xarray as xr
+import zarr
+
+
+def get_asset_href(item, asset_key):
+    # works with both pystac items and items loaded as dictionaries
+    assets = item.assets if hasattr(item, "assets") else item.get("assets", {})
+    asset = assets.get(asset_key, None)
+    if asset is None:
+        return None
+    return asset.href if hasattr(asset, "href") else asset["href"]
+
+
+def load_references(href):
+    # load and parse a kerchunk reference file, or decode references inlined into the item
+    # (see netcdf2stac --inline-kerchunk)
+    if href.startswith("data:"):
+        (header, payload) = href[len("data:"):].split(",", 1)
+        if header.endswith(";base64"):
+            content = base64.b64decode(payload)
+        else:
+            content = urllib.parse.unquote_to_bytes(payload)
+    else:
+        with fsspec.open(href, "rb") as f:
+            content = f.read()
+    return json.loads(content)
+
+
+class LRUCache:
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_create(self, key, create_fn):
+        # concurrent requests for the same key wait on a single future, so each value is only created once
+        with self.lock:
+            future = self.entries.get(key, None)
+            if future is not None:
+                self.entries.move_to_end(key)
+                owner = False
+            else:
+                future = concurrent.futures.Future()
+                self.entries[key] = future
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                owner = True
+
+        if owner:
+            try:
+                future.set_result(create_fn())
+            except Exception as exc:
+                with self.lock:
+                    if self.entries.get(key, None) is future:
+                        del self.entries[key]
+                future.set_exception(exc)
+
+        return future.result()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class StacDatasetOpener:
+
+    def __init__(self, asset_key="reference_file", remote_protocol="https", remote_options=None, chunks=None,
+                 max_cached=128, max_workers=8):
+        """
+        Open xarray datasets from STAC items via their kerchunk reference assets, caching the parsed references
+        and opened datasets so that items requested repeatedly (for example, climatology items) are
+        only opened once.
+
+        :param asset_key: the key of the kerchunk reference asset in each item
+        :param remote_protocol: protocol used to access the netcdf4 files the references point to
+        :param remote_options: options passed to the remote filesystem
+        :param chunks: chunks passed to xarray.open_dataset, the default (None) uses {}, opening datasets lazily using dask
+        :param max_cached: the maximum number of parsed references and datasets to keep
+        :param max_workers: the maximum number of datasets to open concurrently
+        """
+        self.asset_key = asset_key
+        self.remote_protocol = remote_protocol
+        self.remote_options = dict(remote_options or {})
+        if int(zarr.__version__.split(".")[0]) >= 3:
+            # zarr 3 reads through the reference filesystem asynchronously, the remote filesystem must match
+            self.remote_options.setdefault("asynchronous", True)
+        self.chunks = {} if chunks is None else chunks
+        self.max_workers = max_workers
+        self.references = LRUCache(max_cached)
+        self.datasets = LRUCache(max_cached)
+
+    def get_references(self, href):
+        return self.references.get_or_create(href, lambda: load_references(href))
+
+    def open_dataset(self, item):
+        href = get_asset_href(item, self.asset_key)
+        if href is None:
+            return None
+
+        def open_fn():
+            return xr.open_dataset("reference://", engine="zarr", chunks=self.chunks, backend_kwargs={
+                "consolidated": False,
+                "storage_options": {"fo": self.get_references(href), "remote_protocol": self.remote_protocol,
+                                    "remote_options": self.remote_options}
+            })
+
+        return self.datasets.get_or_create(href, open_fn)
+
+    def open_datasets(self, items):
+        # open the items concurrently, returning the datasets in the same order as the items
+        items = list(items)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.open_dataset, items))
+
+    def open_combined_dataset(self, items, dim="time"):
+        # open the items concurrently and lazily concatenate them into a single dataset, sorted along dim
+        datasets = [ds for ds in self.open_datasets(items) if ds is not None]
+        if not datasets:
+            return None
+        combined = xr.concat(datasets, dim=dim, data_vars="minimal", coords="minimal", compat="override")
+        if dim in combined.coords:
+            combined = combined.sortby(dim)
+        return combined
+
+    def clear(self):
+        self.references.clear()
+        self.datasets.clear()
@@ -1,7 +1,14 @@
 import unittest
 import os
+import glob
+import json
+import tempfile
 
-from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+import numpy
+import PIL.Image
+import xarray
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac, NCFileInspector, get_band_statistics
 
 test_folder = os.path.split(__file__)[0]
 
@@ -44,3 +51,101 @@ class BasicTest(unittest.TestCase):
         converter.run()
 
 
+    def test_chunked_sm(self):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sm.json")
+        ]
+
+        thumbnails = {}
+        for (subfolder, chunks, memory_limit) in [("sm-items", None, None), ("sm-items-chunked", {"lat": 100, "lon": 100}, "1GB")]:
+            converter = Netcdf2Stac(
+                base_folder="./stac-generated",
+                input_paths=[os.path.join(test_folder,"sm","data","2024","**","*.nc")],
+                collection_filename="sm-collection.geojson",
+                config_paths=config_paths,
+                item_subfolder=subfolder+"/{year}/{month:02d}/",
+                generate_kerchunk_assets=False,
+                generate_thumbnail_assets=True,
+                overwrite_items=True,
+                chunks=chunks,
+                memory_limit=memory_limit)
+
+            converter.run()
+            self.assertGreater(converter.peak_rss, 0)
+
+            thumbnail_path = os.path.join("./stac-generated", subfolder, "2024", "01", "EOCIS-SM-L4-WB-AFRICA-TAMSAT-20240101-fv2.3.0.png")
+            thumbnails[subfolder] = numpy.asarray(PIL.Image.open(thumbnail_path))
+
+        # reading chunk by chunk should not change the thumbnail
+        numpy.testing.assert_array_equal(thumbnails["sm-items"], thumbnails["sm-items-chunked"])
+
+    def test_chunk_limit(self):
+        # explicit chunk sizes are reduced so that a chunk of each variable fits within the limit
+        fpath = glob.glob(os.path.join(test_folder, "sm", "data", "2024", "**", "*.nc"), recursive=True)[0]
+        i = NCFileInspector(fpath, "smcl", {}, chunks={"lat": 1000, "lon": 1000}, max_chunk_bytes=100000)
+        for var in i.get_dataset().data_vars.values():
+            self.assertLessEqual(var.dtype.itemsize * numpy.prod([max(c) for c in var.chunks]), 100000)
+
+    def test_statistics(self):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            statistics_config_path = os.path.join(tmp, "statistics.json")
+            with open(statistics_config_path, "w") as f:
+                f.write(json.dumps({"statistics": {"variables": ["analysed_sst", "sea_ice_fraction"], "histogram_bins": 10}}))
+
+            converter = Netcdf2Stac(
+                base_folder="./stac-generated",
+                input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+                collection_filename="sst-collection.geojson",
+                config_paths=config_paths + [statistics_config_path],
+                item_subfolder="sst-items-statistics/{year}/{month:02d}/",
+                generate_kerchunk_assets=False,
+                generate_thumbnail_assets=True,
+                generate_statistics=True,
+                overwrite_items=True)
+            converter.run()
+
+        (item_path,) = converter.item_paths
+        with open(item_path) as f:
+            item = json.loads(f.read())
+        self.assertIn("https://stac-extensions.github.io/raster/v1.1.0/schema.json", item["stac_extensions"])
+        (netcdf_asset,) = [asset for asset in item["assets"].values() if asset["type"] == "application/netcdf"]
+        (sst_band, ice_band) = netcdf_asset["raster:bands"]
+        self.assertEqual((sst_band["name"], sst_band["unit"]), ("analysed_sst", "kelvin"))
+
+        sst = xarray.open_dataset(glob.glob(os.path.join(test_folder, "sst", "data", "2022", "**", "*.nc"), recursive=True)[0])["analysed_sst"].values
+        valid = numpy.isfinite(sst)
+        self.assertAlmostEqual(sst_band["statistics"]["minimum"], float(sst[valid].min()), places=4)
+        self.assertAlmostEqual(sst_band["statistics"]["maximum"], float(sst[valid].max()), places=4)
+        self.assertAlmostEqual(sst_band["statistics"]["mean"], float(sst[valid].mean()), places=3)
+        self.assertAlmostEqual(sst_band["statistics"]["valid_percent"], 100 * valid.sum() / valid.size, places=4)
+        self.assertEqual(sum(sst_band["histogram"]["buckets"]), valid.sum())
+        self.assertEqual(len(ice_band["histogram"]["buckets"]), 10)
+
+    def test_statistics_passes(self):
+        from dask.callbacks import Callback
+
+        class ComputeCounter(Callback):
+            # count the number of times a dask graph is computed
+            def __init__(self):
+                super().__init__()
+                self.count = 0
+
+            def _start(self, dsk):
+                self.count += 1
+
+        fpath = glob.glob(os.path.join(test_folder, "sst", "data", "2022", "**", "*.nc"), recursive=True)[0]
+        da = xarray.open_dataset(fpath)["analysed_sst"].load()
+        expected = get_band_statistics(da, 10, [270, 310])
+        for (histogram_range, passes) in [([270, 310], 1), (None, 2)]:
+            with ComputeCounter() as counter:
+                band = get_band_statistics(da.chunk({"lat": 50, "lon": 50}), 10, histogram_range)
+            self.assertEqual(counter.count, passes)
+            if histogram_range:
+                self.assertEqual(band["histogram"], expected["histogram"])
+                self.assertAlmostEqual(band["statistics"]["mean"], expected["statistics"]["mean"], places=4)
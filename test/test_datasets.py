@@ -0,0 +1,89 @@
+import unittest
+import os
+import json
+import re
+import tempfile
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+from eocis_stac_tools.client.datasets import StacDatasetOpener
+
+test_folder = os.path.split(__file__)[0]
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+
+    # kerchunk references are read using HTTP range requests, which SimpleHTTPRequestHandler does not support
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=test_folder, **kwargs)
+
+    def do_GET(self):
+        m = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if m is None or not os.path.isfile(path):
+            return super().do_GET()
+        with open(path, "rb") as f:
+            f.seek(int(m.group(1)))
+            content = f.read(int(m.group(2)) - int(m.group(1)) + 1)
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Content-Range", f"bytes {m.group(1)}-{m.group(2)}/{os.path.getsize(path)}")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class DatasetOpenerTest(unittest.TestCase):
+
+    def test_open_datasets(self):
+        # serve the test folder on a free port
+        server = HTTPServer(("localhost", 0), RangeRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                # refer to the netcdf4 files served by the test server, and inline the kerchunk references
+                url_config_path = os.path.join(tmp, "url.json")
+                with open(url_config_path, "w") as f:
+                    f.write(json.dumps({"netcdf_url": f"http://localhost:{port}/sst/data/{{year}}/{{month:02}}/{{day:02}}/"}))
+                config_paths = [
+                    os.path.join(test_folder, "configurations","eocis-defaults.json"),
+                    os.path.join(test_folder, "configurations", "sst.json"),
+                    url_config_path
+                ]
+
+                converter = Netcdf2Stac(
+                    base_folder="./stac-generated",
+                    input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+                    collection_filename="sst-collection.geojson",
+                    config_paths=config_paths,
+                    item_subfolder="sst-items-inline/{year}/{month:02d}/",
+                    generate_kerchunk_assets=True,
+                    inline_kerchunk=True,
+                    generate_thumbnail_assets=False,
+                    overwrite_items=True)
+                converter.run()
+
+            items = []
+            for root, dirs, files in os.walk(os.path.join("./stac-generated", "sst-items-inline")):
+                for file in files:
+                    if file.endswith(".geojson"):
+                        with open(os.path.join(root, file)) as f:
+                            items.append(json.loads(f.read()))
+            self.assertEqual(len(items), 1)
+
+            opener = StacDatasetOpener(remote_protocol="http", max_workers=4)
+            # request the item three times, the repeated requests should be served from the cache
+            datasets = opener.open_datasets(items * 3)
+            self.assertIs(datasets[0], datasets[1])
+            self.assertIs(datasets[0], datasets[2])
+
+            combined = opener.open_combined_dataset(items * 2)
+            self.assertEqual(combined.sizes["time"], 2)
+            self.assertAlmostEqual(float(combined.analysed_sst.mean()), float(datasets[0].analysed_sst.mean()), places=3)
+        finally:
+            server.shutdown()
+            server.server_close()
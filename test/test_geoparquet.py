@@ -0,0 +1,108 @@
+import unittest
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+from eocis_stac_tools.api.geoparquet import GeoParquetWriter, read_geoparquet
+
+test_folder = os.path.split(__file__)[0]
+
+def make_item(item_id, dt, **props):
+    props["datetime"] = dt
+    return {
+        "type": "Feature",
+        "id": item_id,
+        "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]]]},
+        "bbox": [0, 0, 1, 1],
+        "properties": props,
+        "links": [{"rel": "collection", "href": "../collection.json", "type": "application/json"}],
+        "assets": {"data": {"href": f"{item_id}.nc", "roles": ["data"]}}
+    }
+
+class GeoParquetTest(unittest.TestCase):
+
+    def make_converter(self, overwrite_items, geoparquet_path):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sm.json")
+        ]
+
+        return Netcdf2Stac(
+            base_folder="./stac-generated",
+            input_paths=[os.path.join(test_folder,"sm","data","2024","**","*.nc")],
+            collection_filename="sm-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sm-items/{year}/{month:02d}/",
+            generate_kerchunk_assets=False,
+            generate_thumbnail_assets=False,
+            overwrite_items=overwrite_items,
+            geoparquet_path=geoparquet_path)
+
+    def test_geoparquet(self):
+        geoparquet_path = os.path.join("./stac-generated", "sm-items.parquet")
+        shutil.rmtree(geoparquet_path, ignore_errors=True)
+
+        for run in range(2):
+            self.make_converter(True, "sm-items.parquet").run()
+
+        # the second run replaces the rows written by the first
+        self.assertEqual(len(os.listdir(os.path.join(geoparquet_path, "year=2024"))), 1)
+
+        table = pq.read_table(geoparquet_path, columns=["id", "datetime", "dataset_id", "year"])
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(set(table.column("dataset_id").to_pylist()), {"SOIL-MOISTURE-V2.3.0"})
+
+        # links and assets are stored as (lists of) structs, as required by the stac-geoparquet specification
+        schema = pq.read_schema(os.path.join(geoparquet_path, "_common_metadata"))
+        self.assertTrue(pa.types.is_struct(schema.field("assets").type))
+        self.assertTrue(pa.types.is_struct(schema.field("links").type.value_type))
+        self.assertNotIn("item_path", schema.names)
+
+    def test_existing_items(self):
+        # enabling geoparquet output on an existing catalogue exports the items that are skipped
+        geoparquet_path = os.path.join("./stac-generated", "sm-items-existing.parquet")
+        shutil.rmtree(geoparquet_path, ignore_errors=True)
+        self.make_converter(True, None).run()
+        self.make_converter(False, "sm-items-existing.parquet").run()
+        table = read_geoparquet(geoparquet_path, columns=["id"])
+        self.assertEqual(table.num_rows, 4)
+
+    def test_schema(self):
+        geoparquet_path = os.path.join("./stac-generated", "schema-test.parquet")
+        shutil.rmtree(geoparquet_path, ignore_errors=True)
+
+        # a property missing from the first item, and a property that is null for the whole flush
+        writer = GeoParquetWriter(geoparquet_path)
+        writer.add_item(make_item("a", "2020-01-01T00:00:00Z", count=1, comment=None), item_path="a")
+        writer.add_item(make_item("b", "2020-01-02T00:00:00Z", count=2, extra="x", comment=None), item_path="b")
+        writer.flush()
+
+        # append to another year, where the null property now has a value
+        writer = GeoParquetWriter(geoparquet_path)
+        writer.add_item(make_item("c", "2021-01-01T00:00:00Z", count=3.5, comment="text", added=True), item_path="c")
+        writer.flush()
+
+        table = read_geoparquet(geoparquet_path)
+        rows = {row["id"]: row for row in table.to_pylist()}
+        self.assertEqual(set(rows.keys()), {"a", "b", "c"})
+        self.assertEqual(rows["b"]["extra"], "x")
+        self.assertEqual(rows["c"]["comment"], "text")
+        self.assertEqual(rows["c"]["count"], 3.5)
+        self.assertIsNone(rows["a"]["added"])
+        self.assertEqual(rows["c"]["year"], 2021)
+        self.assertEqual(rows["a"]["assets"]["data"], {"href": "a.nc", "roles": ["data"]})
+        self.assertEqual(rows["a"]["links"][0]["rel"], "collection")
+
+        # replacing an item, keyed on its path, with an item with a new id and an extra asset
+        writer = GeoParquetWriter(geoparquet_path)
+        item = make_item("a2", "2020-01-01T00:00:00Z", count=1)
+        item["assets"]["thumbnail"] = {"href": "a2.png", "title": "thumbnail"}
+        writer.add_item(item, item_path="a")
+        writer.flush()
+        rows = {row["id"]: row for row in read_geoparquet(geoparquet_path).to_pylist()}
+        self.assertEqual(set(rows.keys()), {"a2", "b", "c"})
+        self.assertEqual(rows["a2"]["assets"]["thumbnail"]["href"], "a2.png")
+        self.assertIsNone(rows["b"]["assets"]["thumbnail"])
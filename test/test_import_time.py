@@ -0,0 +1,54 @@
+import unittest
+import os
+import json
+import subprocess
+import sys
+
+test_folder = os.path.split(__file__)[0]
+
+HEAVY_MODULES = ["xarray", "pandas", "numpy", "dask", "kerchunk", "datashader", "pystac", "httpx", "httpx_auth"]
+
+def get_loaded_modules(script):
+    # run the script in a fresh interpreter and return which of the heavy modules it imported
+    script += f"\nimport sys, json\nprint(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", script], cwd=test_folder, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().split("\n")[-1])
+
+HELP_SCRIPT = """
+import contextlib, io, sys
+from eocis_stac_tools.cli import {module}
+sys.argv = ["{module}", "--help"]
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        {module}.main()
+    except SystemExit:
+        pass
+"""
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_help(self):
+        for module in ["netcdf2stac", "uploadstac"]:
+            self.assertEqual(get_loaded_modules(HELP_SCRIPT.format(module=module)), [], module)
+
+    def test_api_import(self):
+        self.assertEqual(get_loaded_modules("import eocis_stac_tools.api.netcdf2stac"), ["pystac"])
+
+    def test_optional_stages(self):
+        # without kerchunk or thumbnail assets, kerchunk and datashader should not be imported
+        script = f"""
+import os
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+Netcdf2Stac(base_folder="./stac-generated",
+            input_paths=[os.path.join("sst", "data", "2022", "**", "*.nc")],
+            collection_filename="sst-collection.geojson",
+            config_paths=[os.path.join("configurations", "eocis-defaults.json"), os.path.join("configurations", "sst.json")],
+            item_subfolder="sst-items-lazy/{{year}}/{{month:02d}}/",
+            generate_kerchunk_assets=False,
+            generate_thumbnail_assets=False,
+            overwrite_items=True).run()
+"""
+        loaded = get_loaded_modules(script)
+        self.assertIn("xarray", loaded)
+        self.assertNotIn("kerchunk", loaded)
+        self.assertNotIn("datashader", loaded)
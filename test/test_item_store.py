@@ -0,0 +1,83 @@
+import unittest
+import os
+import datetime
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+from eocis_stac_tools.api.item_store import ItemStore
+
+test_folder = os.path.split(__file__)[0]
+
+def make_item(item_id, bbox, dt, **props):
+    props["datetime"] = dt
+    return {
+        "type": "Feature",
+        "id": item_id,
+        "collection": "test-collection",
+        "bbox": bbox,
+        "properties": props
+    }
+
+class ItemStoreTest(unittest.TestCase):
+
+    def test_search(self):
+        store = ItemStore(":memory:")
+        store.add_item(make_item("a", [-10, 40, 0, 50], "2023-01-01T12:00:00Z", day_of_year=1), path="a.geojson")
+        store.add_item(make_item("b", [100, -10, 110, 0], "2023-01-02T12:00:00Z", day_of_year=2), path="b.geojson")
+        store.add_item(make_item("c", [-180, -90, 180, 90], "2023-02-01T12:00:00Z", day_of_year=32), path="c.geojson")
+
+        ids = lambda items: [item["id"] for item in items]
+
+        self.assertEqual(ids(store.search(bbox=[-12, 48, 3, 61])), ["a", "c"])
+        self.assertEqual(ids(store.search(datetime=(datetime.datetime(2023, 1, 1), datetime.datetime(2023, 1, 4, 23, 59, 59)))), ["a", "b"])
+        self.assertEqual(ids(store.search(datetime="2023-01-02T00:00:00Z/..")), ["b", "c"])
+        self.assertEqual(ids(store.search(properties={"day_of_year": 2})), ["b"])
+        self.assertEqual(ids(store.search(properties={"day_of_year": {"gte": 2}}, limit=1)), ["b"])
+        self.assertEqual(ids(store.search(collections=["other-collection"])), [])
+
+        # regenerating an item replaces the previous version stored at the same path
+        store.add_item(make_item("d", [-10, 40, 0, 50], "2023-01-01T12:00:00Z", day_of_year=1), path="a.geojson")
+        self.assertEqual(ids(store.search(properties={"day_of_year": 1})), ["d"])
+        self.assertEqual(ids(store.search(bbox=[-12, 48, 3, 61])), ["d", "c"])
+
+    def test_netcdf2stac_item_store(self):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ]
+
+        converter = Netcdf2Stac(
+            base_folder="./stac-generated",
+            input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+            collection_filename="sst-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sst-items/{year}/{month:02d}/",
+            generate_kerchunk_assets=False,
+            generate_thumbnail_assets=False,
+            overwrite_items=True,
+            item_store_path="sst-items.db")
+
+        converter.run()
+
+        store = ItemStore(os.path.join("./stac-generated", "sst-items.db"))
+        items = store.search(collections=["sst-cdrv3-collection"], bbox=[-12, 48, 3, 61], datetime="2022-01-01T00:00:00Z/2022-01-01T23:59:59Z")
+        self.assertEqual(len(items), 1)
+        store.close()
+
+        # items that already exist are skipped, but should still be indexed into a new store
+        db_path = os.path.join("./stac-generated", "sst-items-existing.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        converter = Netcdf2Stac(
+            base_folder="./stac-generated",
+            input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+            collection_filename="sst-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sst-items/{year}/{month:02d}/",
+            generate_kerchunk_assets=False,
+            generate_thumbnail_assets=False,
+            item_store_path="sst-items-existing.db")
+        converter.run()
+
+        store = ItemStore(db_path)
+        self.assertEqual([item["id"] for item in store.search()], [item["id"] for item in items])
+        store.close()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+
+test_folder = os.path.split(__file__)[0]
+
+class ObjectStoreHandler(BaseHTTPRequestHandler):
+
+    # a minimal stand-in for an object store accepting HTTP PUT, returning the md5 of each object as its ETag
+
+    objects = {}
+    puts = []
+
+    def do_HEAD(self):
+        content = self.objects.get(self.path, None)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"' + hashlib.md5(content).hexdigest() + '"')
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+
+    def do_PUT(self):
+        self.objects[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.puts.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+class PublisherTest(unittest.TestCase):
+
+    def make_converter(self, port, **kwargs):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ]
+
+        return Netcdf2Stac(
+            base_folder="./stac-generated",
+            input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+            collection_filename="sst-publish-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sst-items-publish/{year}/{month:02d}/",
+            generate_kerchunk_assets=True,
+            generate_thumbnail_assets=True,
+            publish_url=f"http://localhost:{port}/stac/",
+            publish_workers=4,
+            **kwargs)
+
+    def test_publish(self):
+        # serve the stand-in object store on a free port
+        server = ThreadingHTTPServer(("localhost", 0), ObjectStoreHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        try:
+            converter = self.make_converter(port, overwrite_items=True)
+            converter.run()
+            self.assertEqual(converter.publish_summary, {"uploaded": 4, "skipped": 0, "failed": 0})
+            prefix = "/stac/sst-items-publish/2022/01/20220101120000-C3S-L4_GHRSST-SSTdepth-OSTIA-GLOB_ICDR3.0-v02.0-fv01.0-subset"
+            self.assertEqual(sorted(ObjectStoreHandler.objects), sorted([
+                "/stac/sst-publish-collection.geojson", prefix + ".geojson", prefix + ".png", prefix + "-kerchunk.json"]))
+            with open(os.path.join("./stac-generated", "sst-publish-collection.geojson"), "rb") as f:
+                self.assertEqual(ObjectStoreHandler.objects["/stac/sst-publish-collection.geojson"], f.read())
+
+            # on a second run the existing item is skipped and the files already published are not uploaded again
+            ObjectStoreHandler.puts = []
+            converter = self.make_converter(port)
+            converter.run()
+            self.assertEqual(ObjectStoreHandler.puts, [])
+            self.assertEqual(converter.publish_summary, {"uploaded": 0, "skipped": 4, "failed": 0})
+        finally:
+            server.shutdown()
+            server.server_close()
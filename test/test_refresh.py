@@ -0,0 +1,104 @@
+import unittest
+import os
+import json
+import glob
+import tempfile
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+
+test_folder = os.path.split(__file__)[0]
+
+class RefreshTest(unittest.TestCase):
+
+    def make_converter(self, extra_config_paths=None, base_folder="./stac-generated", **kwargs):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ] + (extra_config_paths or [])
+
+        return Netcdf2Stac(
+            base_folder=base_folder,
+            input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+            collection_filename="sst-refresh-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sst-items-refresh/{year}/{month:02d}/",
+            generate_kerchunk_assets=True,
+            generate_thumbnail_assets=True,
+            **kwargs)
+
+    def get_outputs(self, base_folder="./stac-generated"):
+        folder = os.path.join(base_folder, "sst-items-refresh")
+        (item_path,) = glob.glob(os.path.join(folder, "**", "*.geojson"), recursive=True)
+        with open(item_path) as f:
+            item = json.loads(f.read())
+        mtimes = {}
+        for pattern in ["*-kerchunk.json", "*.png"]:
+            (path,) = glob.glob(os.path.join(folder, "**", pattern), recursive=True)
+            mtimes[pattern] = os.stat(path).st_mtime_ns
+        return (item, mtimes)
+
+    def test_overwrite_keeps_id(self):
+        # regenerated items keep their id, so that syncing a catalogue updates them rather than replacing them
+        self.make_converter(overwrite_items=True).run()
+        (item, _) = self.get_outputs()
+        self.make_converter(overwrite_items=True).run()
+        (overwritten_item, _) = self.get_outputs()
+        self.assertEqual(overwritten_item["id"], item["id"])
+
+    def test_refresh_metadata(self):
+        self.make_converter(overwrite_items=True).run()
+        (item, mtimes) = self.get_outputs()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # add a templated property, only the item should be regenerated
+            property_config_path = os.path.join(tmp, "property.json")
+            with open(property_config_path, "w") as f:
+                f.write(json.dumps({"templated_properties": {"refreshed": "{dt.year}"}}))
+            converter = self.make_converter([property_config_path], refresh_metadata=True)
+            converter.run()
+            (refreshed_item, refreshed_mtimes) = self.get_outputs()
+            self.assertEqual(refreshed_item["id"], item["id"])
+            self.assertEqual(refreshed_item["properties"]["refreshed"], "2022")
+            self.assertEqual(refreshed_mtimes, mtimes)
+            self.assertEqual(converter.changes, {"items_written": 1, "items_unchanged": 0, "assets_generated": 0, "assets_reused": 2})
+
+            # refreshing again without changes leaves the item untouched
+            converter = self.make_converter([property_config_path], refresh_metadata=True)
+            converter.run()
+            self.assertEqual(converter.changes["items_unchanged"], 1)
+
+            # changing the thumbnail configuration regenerates the thumbnail but not the kerchunk file
+            thumbnail_config_path = os.path.join(tmp, "thumbnail.json")
+            with open(thumbnail_config_path, "w") as f:
+                f.write(json.dumps({"thumbnail": {"vmax": 300}}))
+            converter = self.make_converter([property_config_path, thumbnail_config_path], refresh_metadata=True)
+            converter.run()
+            (_, refreshed_mtimes) = self.get_outputs()
+            self.assertEqual(refreshed_mtimes["*-kerchunk.json"], mtimes["*-kerchunk.json"])
+            self.assertNotEqual(refreshed_mtimes["*.png"], mtimes["*.png"])
+            self.assertEqual((converter.changes["assets_generated"], converter.changes["assets_reused"]), (1, 1))
+
+    def test_refresh_without_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # outputs written before changes to assets were recorded
+            self.make_converter(base_folder=tmp, overwrite_items=True).run()
+            os.remove(os.path.join(tmp, ".netcdf2stac-assets.json"))
+            (_, mtimes) = self.get_outputs(tmp)
+
+            # the assets are newer than the input file so they are reused, and their fingerprints are recorded
+            converter = self.make_converter(base_folder=tmp, refresh_metadata=True)
+            converter.run()
+            self.assertEqual((converter.changes["assets_generated"], converter.changes["assets_reused"]), (0, 2))
+            with open(os.path.join(tmp, ".netcdf2stac-assets.json")) as f:
+                (records,) = json.loads(f.read()).values()
+            self.assertEqual(set(records.keys()), {"kerchunk", "thumbnail"})
+
+            # so a later change to the thumbnail configuration is picked up
+            thumbnail_config_path = os.path.join(tmp, "thumbnail.json")
+            with open(thumbnail_config_path, "w") as f:
+                f.write(json.dumps({"thumbnail": {"vmax": 300}}))
+            converter = self.make_converter([thumbnail_config_path], base_folder=tmp, refresh_metadata=True)
+            converter.run()
+            (_, refreshed_mtimes) = self.get_outputs(tmp)
+            self.assertEqual(refreshed_mtimes["*-kerchunk.json"], mtimes["*-kerchunk.json"])
+            self.assertNotEqual(refreshed_mtimes["*.png"], mtimes["*.png"])
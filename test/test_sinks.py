@@ -0,0 +1,100 @@
+import unittest
+import os
+import io
+import json
+import tarfile
+import tempfile
+import zipfile
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+from eocis_stac_tools.api.sinks import ArchiveSink, DirectorySink, MemorySink, NDJSONSink
+
+test_folder = os.path.split(__file__)[0]
+
+ITEM_PATH = "sst-items-sink/2022/01/20220101120000-C3S-L4_GHRSST-SSTdepth-OSTIA-GLOB_ICDR3.0-v02.0-fv01.0-subset"
+
+class SinksTest(unittest.TestCase):
+
+    def make_converter(self, sink, **kwargs):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ]
+
+        return Netcdf2Stac(
+            base_folder=None,
+            input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+            collection_filename="sst-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sst-items-sink/{year}/{month:02d}/",
+            sink=sink,
+            **kwargs)
+
+    def test_memory(self):
+        sink = MemorySink()
+        self.make_converter(sink, generate_kerchunk_assets=True, generate_thumbnail_assets=True).run()
+        self.assertEqual(sorted(sink.files), sorted([
+            "sst-collection.geojson", ITEM_PATH + ".geojson", ITEM_PATH + ".png", ITEM_PATH + "-kerchunk.json"]))
+        item = json.loads(sink.files[ITEM_PATH + ".geojson"])
+        self.assertEqual(item["type"], "Feature")
+        self.assertTrue(sink.files[ITEM_PATH + ".png"].startswith(b"\x89PNG"))
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for archive_filename in ["output.zip", "output.tar.gz"]:
+                archive_path = os.path.join(tmp, archive_filename)
+                self.make_converter(ArchiveSink(archive_path), generate_kerchunk_assets=True,
+                                    generate_thumbnail_assets=False).run()
+                if archive_filename.endswith(".zip"):
+                    with zipfile.ZipFile(archive_path) as z:
+                        names = z.namelist()
+                        item = json.loads(z.read(ITEM_PATH + ".geojson"))
+                else:
+                    with tarfile.open(archive_path) as t:
+                        names = t.getnames()
+                        item = json.loads(t.extractfile(ITEM_PATH + ".geojson").read())
+                self.assertEqual(sorted(names), sorted([
+                    "sst-collection.geojson", ITEM_PATH + ".geojson", ITEM_PATH + "-kerchunk.json"]), archive_filename)
+                self.assertIn("reference_file", item["assets"])
+
+    def test_ndjson(self):
+        stream = io.StringIO()
+        self.make_converter(NDJSONSink(stream, batch_size=1), inline_kerchunk=True).run()
+        lines = stream.getvalue().strip().split("\n")
+        # only the item and collection are written, the kerchunk references are inlined into the item
+        self.assertEqual([json.loads(line)["type"] for line in lines], ["Feature", "Collection"])
+        self.assertTrue(json.loads(lines[0])["assets"]["reference_file"]["href"].startswith("data:application/json;base64,"))
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # a small limit on pending content, so that writes wait for the background thread
+            sink = DirectorySink(tmp, max_pending_bytes=1000)
+            for index in range(50):
+                sink.write(f"items/{index % 5}/item{index}.json", json.dumps({"index": index, "padding": "x" * 300}))
+                # files not yet written are read back from memory
+                self.assertTrue(sink.exists(f"items/{index % 5}/item{index}.json"))
+                self.assertEqual(json.loads(sink.read(f"items/{index % 5}/item{index}.json"))["index"], index)
+            sink.write("items/0/item0.json", json.dumps({"index": -1}))
+            sink.close()
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp, "items"))), ["0", "1", "2", "3", "4"])
+            with open(os.path.join(tmp, "items", "3", "item13.json")) as f:
+                self.assertEqual(json.loads(f.read())["index"], 13)
+            with open(os.path.join(tmp, "items", "0", "item0.json")) as f:
+                self.assertEqual(json.loads(f.read())["index"], -1)
+
+            # errors from the background thread are raised when the sink is flushed
+            with open(os.path.join(tmp, "file"), "w") as f:
+                f.write("not a folder")
+            sink = DirectorySink(tmp)
+            sink.write("file/item.json", "{}")
+            with self.assertRaises(OSError):
+                sink.close()
+
+    def test_unsupported_options(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            archive_path = os.path.join(tmp, "output.zip")
+            for kwargs in [{"item_store_path": "items.db"}, {"geoparquet_path": "items.parquet"}, {"validate_output": True}]:
+                with self.assertRaises(Exception):
+                    self.make_converter(ArchiveSink(archive_path), **kwargs)
+            # the archive is only created once files are written to it
+            self.assertFalse(os.path.exists(archive_path))
@@ -0,0 +1,201 @@
+import unittest
+import os
+import gzip
+import json
+import re
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+
+from eocis_stac_tools.cli import uploadstac
+
+PAGE_SIZE = 2
+
+class StacApiHandler(BaseHTTPRequestHandler):
+
+    # a minimal stand-in for a STAC API with the transactions extension, holding items in memory
+
+    items = {}
+    requests = []
+    accept_gzip = True
+    # seconds to wait before responding to a POST, and the most POST requests handled at once
+    delay = 0
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def send_json(self, status, o=None):
+        content = json.dumps(o).encode("utf-8") if o is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def read_json(self):
+        content = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding", None) == "gzip":
+            if not self.accept_gzip:
+                return None
+            content = gzip.decompress(content)
+        return json.loads(content)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        port = self.server.server_address[1]
+        m = re.fullmatch(r"/collections/([^/]+)/items", url.path)
+        if m is None:
+            return self.send_json(404)
+        offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+        ids = sorted(self.items)
+        page = {"type": "FeatureCollection", "features": [self.items[i] for i in ids[offset:offset + PAGE_SIZE]], "links": []}
+        if offset + PAGE_SIZE < len(ids):
+            page["links"].append({"rel": "next", "href": f"http://localhost:{port}{url.path}?offset={offset + PAGE_SIZE}"})
+        self.send_json(200, page)
+
+    def do_POST(self):
+        item = self.read_json()
+        if item is None:
+            return self.send_json(415)
+        with self.lock:
+            StacApiHandler.in_flight += 1
+            StacApiHandler.max_in_flight = max(StacApiHandler.max_in_flight, StacApiHandler.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            StacApiHandler.in_flight -= 1
+        self.requests.append(("POST", item["id"]))
+        if item["id"] in self.items:
+            return self.send_json(409)
+        self.items[item["id"]] = item
+        self.send_json(201, item)
+
+    def do_PUT(self):
+        item = self.read_json()
+        if item is None:
+            return self.send_json(415)
+        self.requests.append(("PUT", item["id"]))
+        self.items[item["id"]] = item
+        self.send_json(200, item)
+
+    def do_DELETE(self):
+        item_id = self.path.split("/")[-1]
+        self.requests.append(("DELETE", item_id))
+        del self.items[item_id]
+        self.send_json(200)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_item(item_id, value):
+    return {"type": "Feature", "id": item_id, "collection": "test-collection", "properties": {"value": value},
+            "links": [{"rel": "self", "href": f"{item_id}.geojson"}]}
+
+def start_server():
+    # serve the stand-in catalogue on a free port
+    server = ThreadingHTTPServer(("localhost", 0), StacApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    uploadstac.API_URL = f"http://localhost:{server.server_address[1]}/"
+    return server
+
+class UploadStacTest(unittest.TestCase):
+
+    def test_sync(self):
+        remote = [make_item("a", 1), make_item("b", 2), make_item("d", 4), make_item("e", 5)]
+        for item in remote:
+            # the server rewrites links, which should not count as a change
+            item["links"] = [{"rel": "self", "href": f"http://localhost/collections/test-collection/items/{item['id']}"}]
+        StacApiHandler.items = {item["id"]: item for item in remote}
+        StacApiHandler.requests = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for item in [make_item("a", 1), make_item("b", 20), make_item("c", 3), make_item("e", 5)]:
+                with open(os.path.join(tmp, item["id"] + ".geojson"), "w") as f:
+                    f.write(json.dumps(item))
+
+            server = start_server()
+            try:
+                with httpx.Client() as client:
+                    counts = uploadstac.sync_items(client, os.path.join(tmp, "*.geojson"), dry_run=True)
+                    self.assertEqual(StacApiHandler.requests, [])
+                    counts = uploadstac.sync_items(client, os.path.join(tmp, "*.geojson"), concurrency=2)
+                    self.assertEqual(counts, {"added": 1, "updated": 1, "deleted": 1, "unchanged": 2, "failed": 0})
+                    self.assertEqual(sorted(StacApiHandler.requests), [("DELETE", "d"), ("POST", "c"), ("PUT", "b")])
+                    self.assertEqual(sorted(StacApiHandler.items), ["a", "b", "c", "e"])
+                    self.assertEqual(StacApiHandler.items["b"]["properties"]["value"], 20)
+
+                    # once in sync, nothing is sent
+                    StacApiHandler.requests = []
+                    counts = uploadstac.sync_items(client, os.path.join(tmp, "*.geojson"))
+                    self.assertEqual(counts["unchanged"], 4)
+                    self.assertEqual(StacApiHandler.requests, [])
+
+                    # comparing by the updated property, items without it are always sent
+                    counts = uploadstac.sync_items(client, os.path.join(tmp, "*.geojson"), compare="updated")
+                    self.assertEqual(counts["updated"], 4)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_compression(self):
+        StacApiHandler.items = {}
+        StacApiHandler.requests = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for item_id in ["a", "b", "c"]:
+                item = make_item(item_id, 1)
+                # simulate the size of an item with inline kerchunk references
+                item["properties"]["padding"] = "x" * 100000
+                with open(os.path.join(tmp, item_id + ".geojson"), "w") as f:
+                    f.write(json.dumps(item))
+
+            server = start_server()
+            try:
+                with httpx.Client() as client:
+                    uploadstac.COMPRESSION = "gzip"
+                    uploadstac.TRANSFER_STATS.start()
+                    self.assertTrue(uploadstac.add_items(client, os.path.join(tmp, "*.geojson")))
+                    self.assertEqual(sorted(StacApiHandler.items), ["a", "b", "c"])
+                    self.assertEqual(uploadstac.TRANSFER_STATS.requests, 3)
+                    self.assertLess(uploadstac.TRANSFER_STATS.bytes_sent * 10, uploadstac.TRANSFER_STATS.bytes_uncompressed)
+
+                    # if the server does not accept compressed requests, fall back to sending them uncompressed
+                    StacApiHandler.items = {}
+                    StacApiHandler.accept_gzip = False
+                    uploadstac.TRANSFER_STATS.start()
+                    self.assertTrue(uploadstac.add_items(client, os.path.join(tmp, "*.geojson")))
+                    self.assertEqual(sorted(StacApiHandler.items), ["a", "b", "c"])
+                    self.assertIsNone(uploadstac.COMPRESSION)
+                    # one rejected compressed request, then three uncompressed requests
+                    self.assertEqual(uploadstac.TRANSFER_STATS.requests, 4)
+            finally:
+                uploadstac.COMPRESSION = None
+                StacApiHandler.accept_gzip = True
+                server.shutdown()
+                server.server_close()
+
+    def test_add_items_concurrently(self):
+        StacApiHandler.items = {}
+        StacApiHandler.requests = []
+        StacApiHandler.max_in_flight = 0
+
+        with tempfile.TemporaryDirectory() as tmp:
+            item_ids = [f"item{index}" for index in range(7)]
+            for item_id in item_ids:
+                with open(os.path.join(tmp, item_id + ".geojson"), "w") as f:
+                    f.write(json.dumps(make_item(item_id, 1)))
+
+            server = start_server()
+            try:
+                StacApiHandler.delay = 0.2
+                with httpx.Client() as client:
+                    self.assertTrue(uploadstac.add_items(client, os.path.join(tmp, "*.geojson"), concurrency=3))
+                self.assertEqual(sorted(StacApiHandler.items), item_ids)
+                self.assertEqual(StacApiHandler.max_in_flight, 3)
+            finally:
+                StacApiHandler.delay = 0
+                server.shutdown()
+                server.server_close()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import json
+import tempfile
+
+from eocis_stac_tools.api.netcdf2stac import Netcdf2Stac
+from eocis_stac_tools.api.validation import validate_files, SchemaStore, SchemaUnavailable
+
+test_folder = os.path.split(__file__)[0]
+
+CF_SCHEMA_URI = "https://stac-extensions.github.io/cf/v0.2.0/schema.json"
+
+# a minimal stand-in for the cf extension schema, requiring a name for each parameter
+CF_TEST_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "properties": {
+        "properties": {
+            "properties": {
+                "cf:parameter": {"type": "array", "items": {"type": "object", "required": ["name"]}}
+            }
+        }
+    }
+}
+
+def cache_schema(cache_folder, uri, schema):
+    cache_path = SchemaStore(cache_folder=cache_folder).local_path(cache_folder, uri)
+    os.makedirs(os.path.split(cache_path)[0], exist_ok=True)
+    with open(cache_path, "w") as f:
+        f.write(json.dumps(schema))
+
+class ValidationTest(unittest.TestCase):
+
+    def test_validation(self):
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sm.json")
+        ]
+
+        converter = Netcdf2Stac(
+            base_folder="./stac-generated",
+            input_paths=[os.path.join(test_folder,"sm","data","2024","**","*.nc")],
+            collection_filename="sm-collection.geojson",
+            config_paths=config_paths,
+            item_subfolder="sm-items/{year}/{month:02d}/",
+            generate_kerchunk_assets=True,
+            generate_thumbnail_assets=False,
+            overwrite_items=True,
+            validate_output=True,
+            schema_cache_folder=os.path.join("./stac-generated", "empty-schema-cache"))
+
+        converter.run()
+
+        # the cf schema is not cached, so files are checked against the core schemas only
+        report = converter.validation_report
+        self.assertEqual(report["checked"], 5)
+        self.assertEqual(report["invalid"], 0)
+        self.assertEqual(report["unavailable_schemas"], [CF_SCHEMA_URI])
+
+        # break copies of two of the items, all errors should be reported
+        invalid_paths = []
+        for (index, path) in enumerate(converter.item_paths[:2]):
+            with open(path) as f:
+                o = json.loads(f.read())
+            del o["geometry"]
+            o["properties"]["cf:parameter"] = [{"unit": "kg m-2"}]
+            invalid_path = os.path.join("./stac-generated", f"invalid-{index}.geojson")
+            with open(invalid_path, "w") as f:
+                f.write(json.dumps(o))
+            invalid_paths.append(invalid_path)
+
+        with tempfile.TemporaryDirectory() as cache_folder:
+            cache_schema(cache_folder, CF_SCHEMA_URI, CF_TEST_SCHEMA)
+            report = validate_files(converter.item_paths + invalid_paths, cache_folder=cache_folder, max_workers=2, batch_size=2)
+        self.assertEqual(report["checked"], 6)
+        self.assertEqual(report["invalid"], 2)
+        self.assertEqual(report["unavailable_schemas"], [])
+        self.assertEqual(set(report["errors"].keys()), set(invalid_paths))
+        for errors in report["errors"].values():
+            schemas = set(error["schema"] for error in errors)
+            self.assertIn(CF_SCHEMA_URI, schemas)
+            self.assertIn("https://schemas.stacspec.org/v1.1.0/item-spec/json-schema/item.json", schemas)
+
+    def test_statistics(self):
+        # items with statistics use the raster extension, whose schema is not cached here
+        config_paths = [
+            os.path.join(test_folder, "configurations","eocis-defaults.json"),
+            os.path.join(test_folder, "configurations", "sst.json")
+        ]
+
+        with tempfile.TemporaryDirectory() as cache_folder:
+            converter = Netcdf2Stac(
+                base_folder="./stac-generated",
+                input_paths=[os.path.join(test_folder,"sst","data","2022","**","**","*.nc")],
+                collection_filename="sst-collection.geojson",
+                config_paths=config_paths,
+                item_subfolder="sst-items-statistics/{year}/{month:02d}/",
+                generate_kerchunk_assets=False,
+                generate_thumbnail_assets=False,
+                generate_statistics=True,
+                overwrite_items=True,
+                validate_output=True,
+                schema_cache_folder=cache_folder)
+            converter.run()
+
+        report = converter.validation_report
+        self.assertEqual((report["checked"], report["invalid"]), (2, 0))
+        self.assertIn("https://stac-extensions.github.io/raster/v1.1.0/schema.json", report["unavailable_schemas"])
+
+    def test_schema_cache(self):
+        # extension schemas are only available from the cache folder, nothing is bundled in their place
+        with tempfile.TemporaryDirectory() as cache_folder:
+            with self.assertRaises(SchemaUnavailable):
+                SchemaStore(cache_folder=cache_folder).get_schema(CF_SCHEMA_URI)
+            cache_schema(cache_folder, CF_SCHEMA_URI, {"$id": CF_SCHEMA_URI, "title": "cached"})
+            self.assertEqual(SchemaStore(cache_folder=cache_folder).get_schema(CF_SCHEMA_URI)["title"], "cached")